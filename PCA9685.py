@@ -8,7 +8,8 @@ Description:: Say something
 """
 import time
 import math
-import smbus
+from hardware import open_smbus
+from tracer import TRACER, I2C_BLOCK, I2C_WRITE
 
 # ============================================================================
 # Raspi PCA9685 16-Channel PWM Servo Driver
@@ -33,23 +34,95 @@ class PCA9685:
     __ALLLED_OFF_L = 0xFC
     __ALLLED_OFF_H = 0xFD
 
-    def __init__(self, address=0x40, debug=False):
-        self.bus = smbus.SMBus(1)
+    # MODE1 bits
+    __MODE1_RESTART = 0x80  # self-clearing, never kept in the shadow
+    __MODE1_AI = 0x20  # register auto-increment
+
+    # LEDn_OFF_H bit 4, forces the output fully off
+    __FULL_OFF = 0x1000
+
+    # SMBus block transfers carry at most 32 data bytes, i.e. 8 channels
+    __BLOCK_MAX = 32
+
+    def __init__(
+        self, address=0x40, debug=False, block_write=True, cache=True, bus=None
+    ):
+        self.bus = bus if bus is not None else open_smbus(1)
         self.address = address
         self.debug = debug
+        self.block_write = block_write
+        self.cache = cache
+        # Shadow of MODE1/MODE2/PRESCALE and the 64 LED registers, reg -> value.
+        # A register missing from the dict is unknown and must go to the bus.
+        self._shadow = {}
+        # Called after every bus write, e.g. to measure input-to-actuation latency
+        self.on_write = None
         if self.debug:
             print("Reseting PCA9685")
-        self.write(self.__MODE1, 0x00)
+        self.write(self.__MODE1, self.__MODE1_AI if self.block_write else 0x00)
+
+    def _remember(self, reg, value):
+        "Updates the shadow copy of a register after it went to the bus"
+        if self.__ALLLED_ON_L <= reg <= self.__ALLLED_OFF_H:
+            # ALL_LED registers are write-only and land in every channel
+            for channel in range(16):
+                self._shadow[
+                    self.__LED0_ON_L + 4 * channel + reg - self.__ALLLED_ON_L
+                ] = value
+            return
+        if reg == self.__MODE1:
+            value &= ~self.__MODE1_RESTART
+        self._shadow[reg] = value
 
     def write(self, reg, value):
         "Writes an 8-bit value to the specified register/address"
+        if self.cache and self._shadow.get(reg) == value:
+            return
         self.bus.write_byte_data(self.address, reg, value)
+        if TRACER.enabled:
+            TRACER.record(I2C_WRITE, self.address << 8 | reg, value)
+        self._remember(reg, value)
+        if self.on_write is not None:
+            self.on_write()
         if self.debug:
             print("I2C: Write 0x%02X to register 0x%02X" % (value, reg))
 
+    def writeBlock(self, reg, values):
+        "Writes consecutive registers starting at reg in one I2C transaction"
+        values = list(values)
+        if self.cache:
+            # only send the span between the first and last changed byte
+            changed = [
+                i
+                for i, value in enumerate(values)
+                if self._shadow.get(reg + i) != value
+            ]
+            if not changed:
+                return
+            reg, values = reg + changed[0], values[changed[0] : changed[-1] + 1]
+        self.bus.write_i2c_block_data(self.address, reg, values)
+        if TRACER.enabled:
+            TRACER.record(
+                I2C_BLOCK,
+                self.address << 8 | reg,
+                int.from_bytes(bytes(values[:8]), "little", signed=True),
+            )
+        for i, value in enumerate(values):
+            self._remember(reg + i, value)
+        if self.on_write is not None:
+            self.on_write()
+        if self.debug:
+            print(
+                "I2C: Block write %s to register 0x%02X"
+                % (" ".join("0x%02X" % v for v in values), reg)
+            )
+
     def read(self, reg):
         "Read an unsigned byte from the I2C device"
+        if self.cache and reg in self._shadow:
+            return self._shadow[reg]
         result = self.bus.read_byte_data(self.address, reg)
+        self._remember(reg, result & 0xFF)
         if self.debug:
             print(
                 "I2C: Device 0x%02X returned 0x%02X from reg 0x%02X"
@@ -57,6 +130,20 @@ class PCA9685:
             )
         return result
 
+    def invalidate(self):
+        "Forgets the shadow registers, the next access goes to the bus"
+        self._shadow.clear()
+        if self.debug:
+            print("I2C: Shadow registers invalidated")
+
+    def resync(self):
+        "Reloads the shadow registers from the device"
+        self.invalidate()
+        for reg in (self.__MODE1, self.__MODE2, self.__PRESCALE):
+            self.read(reg)
+        for reg in range(self.__LED0_ON_L, self.__LED0_ON_L + 4 * 16):
+            self.read(reg)
+
     def setPWMFreq(self, freq):
         "Sets the PWM frequency"
         prescaleval = 25000000.0  # 25MHz
@@ -71,6 +158,12 @@ class PCA9685:
             print("Final pre-scale: %d" % prescale)
 
         oldmode = self.read(self.__MODE1)
+        if self.read(self.__PRESCALE) == prescale and not oldmode & 0x10:
+            # Prescale already set and oscillator running, skip the sleep dance
+            if self.debug:
+                print("Pre-scale unchanged, skip reprogramming")
+            self.write(self.__MODE2, 0x04)
+            return
         newmode = (oldmode & 0x7F) | 0x10  # sleep
         self.write(self.__MODE1, newmode)  # go to sleep
         self.write(self.__PRESCALE, int(math.floor(prescale)))
@@ -79,15 +172,107 @@ class PCA9685:
         self.write(self.__MODE1, oldmode | 0x80)
         self.write(self.__MODE2, 0x04)
 
+    def getPeriodNs(self):
+        "PWM period in ns from the programmed prescale (nominal 25MHz oscillator)"
+        return (self.read(self.__PRESCALE) + 1) * 4096 * 1e9 / 25000000.0
+
+    def armOneShot(self, pwms):
+        """Loads {channel: (on, off)} with the oscillator stopped, then restarts
+        the counter so every edge is timed by the chip from one common zero.
+        Other channels on this chip skip at most one PWM period.
+        Returns the perf_counter_ns time of the restart."""
+        with self.bus.lock:
+            mode = self.read(self.__MODE1) & 0x6F
+            self.write(self.__MODE1, mode | 0x10)  # sleep, counter stops
+            self.setPWMBatch(pwms)
+            self.write(self.__MODE1, mode)
+            time.sleep(0.0005)  # oscillator start-up
+            self.write(self.__MODE1, mode | self.__MODE1_RESTART)
+            return time.perf_counter_ns()
+
+    def channelsOff(self, channels):
+        "Drives the given channels fully off, one transaction per contiguous run"
+        self.setPWMBatch({channel: (0, self.__FULL_OFF) for channel in channels})
+
     def setPWM(self, channel, on, off):
         "Sets a single PWM channel"
-        self.write(self.__LED0_ON_L + 4 * channel, on & 0xFF)
-        self.write(self.__LED0_ON_H + 4 * channel, on >> 8)
-        self.write(self.__LED0_OFF_L + 4 * channel, off & 0xFF)
-        self.write(self.__LED0_OFF_H + 4 * channel, off >> 8)
+        if self.block_write:
+            self.writeBlock(
+                self.__LED0_ON_L + 4 * channel,
+                (on & 0xFF, on >> 8, off & 0xFF, off >> 8),
+            )
+        else:
+            self.write(self.__LED0_ON_L + 4 * channel, on & 0xFF)
+            self.write(self.__LED0_ON_H + 4 * channel, on >> 8)
+            self.write(self.__LED0_OFF_L + 4 * channel, off & 0xFF)
+            self.write(self.__LED0_OFF_H + 4 * channel, off >> 8)
         if self.debug:
             print("channel: %d  LED_ON: %d LED_OFF: %d" % (channel, on, off))
 
+    def _bridge(self, start, end):
+        "Cached LED registers of channels start..end-1, or None if not all known"
+        if start < end and not self.cache:
+            return None
+        reg = self.__LED0_ON_L + 4 * start
+        values = [self._shadow.get(reg + i) for i in range(4 * (end - start))]
+        return None if None in values else values
+
+    def setPWMBatch(self, pwms):
+        """Sets several channels from {channel: (on, off)}, one transaction per run.
+        With the cache on, short gaps between channels are bridged with their
+        cached values so nearby channels still share one transaction."""
+        if not self.block_write:
+            for channel in sorted(pwms):
+                self.setPWM(channel, *pwms[channel])
+            return
+        run_start = None
+        run = []
+        for channel in sorted(pwms):
+            if run:
+                end = run_start + len(run) // 4
+                gap = None
+                if len(run) + 4 * (channel - end + 1) <= self.__BLOCK_MAX:
+                    gap = self._bridge(end, channel)
+                if gap is not None:
+                    run += gap
+                else:
+                    self.writeBlock(self.__LED0_ON_L + 4 * run_start, run)
+                    run = []
+            if not run:
+                run_start = channel
+            on, off = pwms[channel]
+            run += [on & 0xFF, on >> 8, off & 0xFF, off >> 8]
+        if run:
+            self.writeBlock(self.__LED0_ON_L + 4 * run_start, run)
+        if self.debug:
+            print("channels: %s updated in batch" % sorted(pwms))
+
+    def setAllPWM(self, on, off):
+        "Sets every PWM channel at once through the ALL_LED registers"
+        if self.block_write:
+            self.writeBlock(
+                self.__ALLLED_ON_L, (on & 0xFF, on >> 8, off & 0xFF, off >> 8)
+            )
+        else:
+            self.write(self.__ALLLED_ON_L, on & 0xFF)
+            self.write(self.__ALLLED_ON_H, on >> 8)
+            self.write(self.__ALLLED_OFF_L, off & 0xFF)
+            self.write(self.__ALLLED_OFF_H, off >> 8)
+        if self.debug:
+            print("all channels: LED_ON: %d LED_OFF: %d" % (on, off))
+
+    def allOff(self):
+        "Drives every channel fully off (OFF_H bit 4) in one transaction"
+        self.setAllPWM(0, self.__FULL_OFF)
+
+    def parkAll(self, Angle):
+        "Moves every servo to the same angle in one transaction"
+        if Angle >= 0 and Angle <= 180:
+            pulse = (Angle * (2000 / 180) + 501) * 4096 / 20000
+            self.setAllPWM(0, int(pulse))
+        else:
+            print("Angle out of range")
+
     def setServoPulse(self, channel, pulse):
         "Sets the Servo Pulse,The PWM frequency must be 50HZ"
         pulse = pulse * 4096 / 20000  # PWM frequency is 50HZ,the period is 20000us
@@ -102,4 +287,5 @@ class PCA9685:
             print("Angle out of range")
 
     def exit_PCA9685(self):
+        self.allOff()
         self.write(self.__MODE2, 0x00)
@@ -0,0 +1,255 @@
+"""
+热点路径基准测试：在模拟器后端上运行，报告每秒操作数、每次操作的总线传输次数与时间抖动，
+结果低于保存的基线时以非零状态退出
+
+python benchmark.py                    # 运行并与基线比较
+python benchmark.py --update-baseline  # 以本次结果作为新基线
+
+仓库中的基线只包含模拟后端上确定的每次操作总线传输次数与 GPIO 调用次数；
+ops/s 与机器有关，需要时在本机用 --update-baseline 生成
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault("RIG_BACKEND", "sim")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import hardware  # noqa: E402
+
+BASELINE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json"
+)
+DEFAULT_TOLERANCE = 0.3  # 允许的性能下降比例
+COUNT_TOLERANCE = 0.5  # 每次操作的传输 / GPIO 次数允许的增量，模拟后端上两者是确定的
+
+
+class Result:
+    """
+    单项基准结果
+    """
+
+    def __init__(self, name, ops, seconds, transactions=0, gpio_calls=0, jitter=None):
+        self.name = name
+        self.ops_per_s = ops / seconds if seconds > 0 else 0.0
+        self.tx_per_op = transactions / ops if ops else 0.0
+        self.gpio_per_op = gpio_calls / ops if ops else 0.0
+        self.jitter = jitter or {}
+
+    def to_dict(self):
+        return {
+            "ops_per_s": self.ops_per_s,
+            "tx_per_op": self.tx_per_op,
+            "gpio_per_op": self.gpio_per_op,
+            "jitter_std_us": self.jitter.get("std_us", 0.0),
+        }
+
+
+def measure(name, func, ops, bus=None, gpio=None, jitter=None):
+    """
+    执行 func() ops 次，统计耗时与硬件访问次数
+    """
+    if bus is not None:
+        bus.reset_stats()
+    if gpio is not None:
+        gpio.reset_stats()
+    start = time.perf_counter()
+    for _ in range(ops):
+        func()
+    seconds = time.perf_counter() - start
+    return Result(
+        name,
+        ops,
+        seconds,
+        transactions=bus.transactions if bus is not None else 0,
+        gpio_calls=gpio.calls if gpio is not None else 0,
+        jitter=jitter() if jitter is not None else None,
+    )
+
+
+def bench_set_pwm(controller, bus, gpio):
+    counts = iter(range(1 << 30))
+    return measure(
+        "setPWM",
+        lambda: controller.servo.setPWM(0, 0, 200 + next(counts) % 200),
+        2000,
+        bus=bus,
+    )
+
+
+def bench_servo_sweep(controller, bus, gpio):
+    import rotateController
+
+    def sweep():
+        controller.servo_rotate(
+            resolution=1,
+            start_angle=rotateController.SERVO_START_ANGLE,
+            end_angle=rotateController.SERVO_FINAL_ANGLE,
+            gap_duration=0,
+        )
+        controller.servo_rotate(
+            resolution=1,
+            start_angle=rotateController.SERVO_FINAL_ANGLE,
+            end_angle=rotateController.SERVO_START_ANGLE,
+            gap_duration=0,
+        )
+
+    return measure("servo_rotate", sweep, 50, bus=bus)
+
+
+def bench_servo_timeline(controller, bus, gpio):
+    from servo import ServoCalibration, ServoTimeline
+
+    # 四个舵机同步往返，每个节拍一次批量写入
+    channels = range(4)
+    calibrations = {channel: ServoCalibration() for channel in channels}
+    out = ServoTimeline(
+        calibrations, dict.fromkeys(channels, 0), dict.fromkeys(channels, 180), 90
+    )
+    back = ServoTimeline(
+        calibrations, dict.fromkeys(channels, 180), dict.fromkeys(channels, 0), 90
+    )
+    frames = out.frames + back.frames
+
+    def sweep():
+        for frame in frames:
+            controller.boards.setPWMBatch(frame)
+
+    return measure("servo_timeline", sweep, 50, bus=bus)
+
+
+def bench_rotate(controller, bus, gpio):
+    import pygame
+
+    controller.stepper.timing.reset()
+    return measure(
+        "rotate",
+        lambda: controller.rotate(pygame.K_s).result(),
+        5,
+        gpio=gpio,
+        jitter=controller.stepper.timing.stats,
+    )
+
+
+def bench_draw(controller, bus, gpio):
+    return measure("draw_coordinate_system", controller.draw_coordinate_system, 50)
+
+
+def bench_reaction(controller, bus, gpio):
+    import rotateController
+
+    stay = rotateController.SERVO_FINAL_STAY_DURATION
+    reset_gap = rotateController.SERVO_RESET_GAP_DURATION
+    rotateController.SERVO_FINAL_STAY_DURATION = 0
+    rotateController.SERVO_RESET_GAP_DURATION = 0
+    try:
+        return measure(
+            "b_sequence",
+            lambda: controller.start_reaction().result(),
+            10,
+            bus=bus,
+            gpio=gpio,
+        )
+    finally:
+        rotateController.SERVO_FINAL_STAY_DURATION = stay
+        rotateController.SERVO_RESET_GAP_DURATION = reset_gap
+
+
+BENCHMARKS = [
+    bench_set_pwm,
+    bench_servo_sweep,
+    bench_servo_timeline,
+    bench_rotate,
+    bench_draw,
+    bench_reaction,
+]
+
+
+def compare(results, baseline, tolerance):
+    """
+    与基线比较，返回退化项说明列表
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        # 基线中没有的指标不比较
+        if "ops_per_s" in base and result.ops_per_s < base["ops_per_s"] * (
+            1 - tolerance
+        ):
+            regressions.append(
+                "%s: %.1f ops/s < baseline %.1f ops/s"
+                % (result.name, result.ops_per_s, base["ops_per_s"])
+            )
+        for key, unit in (("tx_per_op", "tx/op"), ("gpio_per_op", "gpio/op")):
+            value = getattr(result, key)
+            if key in base and value > base[key] + COUNT_TOLERANCE:
+                regressions.append(
+                    "%s: %.1f %s > baseline %.1f %s"
+                    % (result.name, value, unit, base[key], unit)
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    args = parser.parse_args()
+
+    import rotateController
+
+    logging.getLogger().setLevel(logging.WARNING)
+    controller = rotateController.RotateController(
+        width=rotateController.SCREEN_WIDTH,
+        height=rotateController.SCREEN_HEIGHT,
+        title=rotateController.SCREEN_TITLE,
+    )
+    bus = hardware.open_smbus(1)
+    gpio = hardware.load_gpio()
+    results = []
+    try:
+        for bench in BENCHMARKS:
+            results.append(bench(controller, bus, gpio))
+    finally:
+        controller.shutdown()
+
+    print(
+        "%-24s %12s %10s %10s %12s"
+        % ("benchmark", "ops/s", "tx/op", "gpio/op", "jitter(us)")
+    )
+    for result in results:
+        print(
+            "%-24s %12.1f %10.1f %10.1f %12.1f"
+            % (
+                result.name,
+                result.ops_per_s,
+                result.tx_per_op,
+                result.gpio_per_op,
+                result.jitter.get("std_us", 0.0),
+            )
+        )
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({r.name: r.to_dict() for r in results}, f, indent=2)
+        print("Baseline saved to %s" % args.baseline)
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline at %s, run with --update-baseline" % args.baseline)
+        return 1
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print("REGRESSION %s" % line)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
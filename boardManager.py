@@ -0,0 +1,100 @@
+"""
+多块 PCA9685 的统一管理：按 (总线, 地址) 登记，全局通道号依登记顺序每块 16 个，
+不同总线上的写入由各自的工作线程并行发送
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from hardware import open_smbus
+from PCA9685 import PCA9685
+
+CHANNELS_PER_BOARD = 16
+
+
+class BoardManager:
+    def __init__(self, block_write=True, cache=True):
+        self.block_write = block_write
+        self.cache = cache
+        self.boards = []  # 登记顺序即全局通道号顺序
+        self.registry = {}  # (bus_id, address) -> PCA9685
+        self.workers = {}  # bus_id -> 单线程执行器
+
+    def add_board(self, bus_id=1, address=0x40):
+        """
+        登记一块板子，返回它的第一个全局通道号
+        """
+        key = (bus_id, address)
+        if key in self.registry:
+            return self.boards.index(self.registry[key]) * CHANNELS_PER_BOARD
+        board = PCA9685(
+            address=address,
+            block_write=self.block_write,
+            cache=self.cache,
+            bus=open_smbus(bus_id),
+        )
+        board.bus_id = bus_id
+        self.registry[key] = board
+        self.boards.append(board)
+        if bus_id not in self.workers:
+            self.workers[bus_id] = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="I2C-%s" % bus_id
+            )
+        return (len(self.boards) - 1) * CHANNELS_PER_BOARD
+
+    def board(self, bus_id, address):
+        return self.registry[(bus_id, address)]
+
+    def locate(self, channel):
+        """
+        全局通道号 -> (板子, 板内通道号)
+        """
+        index, local = divmod(channel, CHANNELS_PER_BOARD)
+        return self.boards[index], local
+
+    def setPWM(self, channel, on, off):
+        board, local = self.locate(channel)
+        board.setPWM(local, on, off)
+
+    def setPWMBatch(self, pwms):
+        """
+        批量设置 {全局通道号: (on, off)}：每块板子一次批量写入，
+        不同总线并行发送，全部完成后返回
+        """
+        per_board = {}
+        for channel, value in pwms.items():
+            board, local = self.locate(channel)
+            per_board.setdefault(board, {})[local] = value
+        self._dispatch(
+            [
+                (board, lambda board=board, values=values: board.setPWMBatch(values))
+                for board, values in per_board.items()
+            ]
+        )
+
+    def setPWMFreq(self, freq):
+        self._dispatch(
+            [
+                (board, lambda board=board: board.setPWMFreq(freq))
+                for board in self.boards
+            ]
+        )
+
+    def allOff(self):
+        self._dispatch([(board, board.allOff) for board in self.boards])
+
+    def exit(self):
+        self._dispatch([(board, board.exit_PCA9685) for board in self.boards])
+        for worker in self.workers.values():
+            worker.shutdown(wait=True)
+
+    def _dispatch(self, jobs):
+        """
+        jobs: [(板子, 函数)]，按板子所在总线分配到对应工作线程；只涉及一条总线时直接执行
+        """
+        buses = set(board.bus_id for board, _ in jobs)
+        if len(buses) <= 1:
+            for _, job in jobs:
+                job()
+            return
+        futures = [self.workers[board.bus_id].submit(job) for board, job in jobs]
+        for future in futures:
+            future.result()
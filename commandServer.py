@@ -0,0 +1,303 @@
+"""
+本地命令服务：通过 Unix socket 或 TCP 远程控制 RotateController
+
+协议：每帧为 4 字节大端长度 + UTF-8 JSON 数组，一帧可包含任意条消息
+请求  {"id": 1, "cmd": "rotate", "args": {"axis": "LR", "direction": 1}}
+事件  {"id": 1, "event": "queued"}                运动指令已进入队列
+      {"id": 1, "event": "done", "result": 101}   执行完成
+      {"id": 1, "event": "error", "error": "..."}
+客户端可以连续发送多帧而不等待回复（流水线），服务端按收到的顺序执行，
+同一轮事件循环内产生的事件合并为一帧返回
+
+RIG_BACKEND=sim python commandServer.py --tcp 127.0.0.1:8765
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from scan import grid as scan_grid
+
+logger = logging.getLogger(name="CommandServer")
+
+HEADER = struct.Struct(">I")
+MAX_FRAME = 16 * 1024 * 1024
+DEFAULT_SOCKET = "/tmp/rotate_controller.sock"
+
+
+def encode_frame(messages):
+    payload = json.dumps(messages, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(payload)) + payload
+
+
+class Connection:
+    """
+    单个客户端连接，事件先放入发件箱，每轮事件循环合并发送一次
+    """
+
+    def __init__(self, loop, writer):
+        self.loop = loop
+        self.writer = writer
+        self.outbox = []
+        self.flush_scheduled = False
+
+    def send(self, message):
+        self.outbox.append(message)
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.loop.call_soon(self.flush)
+
+    def flush(self):
+        self.flush_scheduled = False
+        if self.outbox and not self.writer.is_closing():
+            self.writer.write(encode_frame(self.outbox))
+        self.outbox = []
+
+
+class CommandServer:
+    """
+    命令服务：硬件指令在单个工作线程中按顺序执行，运动指令返回 Future 后立即处理下一条
+    """
+
+    def __init__(self, controller, path=None, host=None, port=None):
+        self.controller = controller
+        self.path = path
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="CommandServer"
+        )
+        self.commands = {
+            "rotate": controller.rotate_axis,
+            "move_to": controller.move_to,
+            "move_point": self.move_point,
+            "servo_rotate": self.servo_rotate,
+            "servo_move": controller.servo_move,
+            "scan": self.scan,
+            "abort_scan": controller.abort_scan,
+            "shoot_pulse": controller.shoot_pulse,
+            "pulse_train": controller.pulse_train,
+            "abort_pulse_train": controller.abort_pulse_train,
+            "fast_cam_start": controller.fast_cam_start,
+            "LED_control": controller.LED_control,
+            "thermostat_control": controller.thermostat_control,
+            "set_outputs": controller.set_outputs,
+            "perf_stats": controller.perf_stats,
+            "ping": lambda: "pong",
+        }
+        self.loop = None
+        self.server = None
+        self._thread = None
+        self._started = threading.Event()
+
+    def move_point(self):
+        self.controller.move_point()
+        return list(self.controller.point)
+
+    def servo_rotate(
+        self, end_angle, start_angle=None, resolution=1, gap_duration=0, **kwargs
+    ):
+        if start_angle is None:
+            start_angle = self.controller.servo_current_angle
+        calibration = self.controller.servo_calibration()
+        for angle in (start_angle, end_angle):
+            if not calibration.contains(angle):
+                raise ValueError("Angle out of range: %s" % angle)
+        completed = self.controller.servo_rotate(
+            resolution=resolution,
+            start_angle=start_angle,
+            end_angle=end_angle,
+            gap_duration=gap_duration,
+            **kwargs,
+        )
+        if not completed:
+            raise RuntimeError("servo_rotate interrupted")
+        return self.controller.servo_current_angle
+
+    def scan(self, points=None, grid=None, **kwargs):
+        """
+        points: [[x, y], ...]；grid: [x_start, y_start, x_end, y_end, pitch]
+        """
+        if grid is not None:
+            points = scan_grid(*grid)
+        points = [tuple(point) for point in points or []]
+        return self.controller.start_scan(points, **kwargs)
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        if self.path is not None:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.server = await asyncio.start_unix_server(self.handle, path=self.path)
+        else:
+            self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        logger.info("Command server listening on %s" % (self.path or self.port))
+        self._started.set()
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    def start(self):
+        """
+        在后台线程中运行服务，返回时已开始监听
+        """
+        self._thread = threading.Thread(
+            target=asyncio.run,
+            args=(self.serve(),),
+            name="CommandServer",
+            daemon=True,
+        )
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def stop(self):
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+        if self._thread is not None:
+            self._thread.join()
+        self.executor.shutdown(wait=True)
+
+    async def handle(self, reader, writer):
+        conn = Connection(self.loop, writer)
+        try:
+            while True:
+                (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+                if length > MAX_FRAME:
+                    logger.error("Frame too large: %s bytes" % length)
+                    break
+                messages = json.loads(await reader.readexactly(length))
+                for message in messages:
+                    self.dispatch(conn, message)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            conn.flush()
+            writer.close()
+
+    def dispatch(self, conn, message):
+        cid = message.get("id")
+        handler = self.commands.get(message.get("cmd"))
+        if handler is None:
+            error = "Unknown command: %s" % message.get("cmd")
+            conn.send({"id": cid, "event": "error", "error": error})
+            return
+        args = message.get("args") or {}
+        future = asyncio.wrap_future(self.executor.submit(handler, **args))
+        future.add_done_callback(lambda f: self.finish(conn, cid, f))
+
+    def finish(self, conn, cid, future):
+        error = future.exception()
+        if error is not None:
+            conn.send({"id": cid, "event": "error", "error": repr(error)})
+            return
+        result = future.result()
+        if isinstance(result, Future):
+            # 运动指令：先告知已入队，完成后再发送 done
+            conn.send({"id": cid, "event": "queued"})
+            asyncio.wrap_future(result).add_done_callback(
+                lambda f: self.finish(conn, cid, f)
+            )
+            return
+        conn.send({"id": cid, "event": "done", "result": result})
+
+
+class CommandClient:
+    """
+    同步客户端，send 一次发送多条指令，不等待回复
+    """
+
+    def __init__(self, path=None, host=None, port=None):
+        if path is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.sock.makefile("rb")
+        self.next_id = 0
+        self.pending = {}  # 已收到但尚未被 wait 取走的最终事件
+
+    def send(self, commands):
+        """
+        commands: [(cmd, args), ...]，返回各指令 id
+        """
+        messages = []
+        for cmd, args in commands:
+            self.next_id += 1
+            messages.append({"id": self.next_id, "cmd": cmd, "args": args})
+        self.sock.sendall(encode_frame(messages))
+        return [message["id"] for message in messages]
+
+    def call(self, cmd, **args):
+        return self.send([(cmd, args)])[0]
+
+    def recv(self):
+        """
+        读取一帧事件
+        """
+        header = self.file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ConnectionError("Connection closed")
+        (length,) = HEADER.unpack(header)
+        return json.loads(self.file.read(length))
+
+    def wait(self, ids):
+        """
+        等待指定指令全部完成，返回 {id: 最终事件}
+        """
+        ids = set(ids)
+        results = {}
+        while True:
+            for cid in list(ids):
+                if cid in self.pending:
+                    results[cid] = self.pending.pop(cid)
+                    ids.discard(cid)
+            if not ids:
+                return results
+            for event in self.recv():
+                if event["event"] in ("done", "error"):
+                    self.pending[event["id"]] = event
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RotateController command server")
+    parser.add_argument("--unix", default=None, help="Unix socket path")
+    parser.add_argument("--tcp", default=None, help="host:port")
+    args = parser.parse_args()
+
+    os.environ.setdefault("RIG_HEADLESS", "1")
+    import rotateController
+
+    controller = rotateController.RotateController(
+        width=rotateController.SCREEN_WIDTH,
+        height=rotateController.SCREEN_HEIGHT,
+        title=rotateController.SCREEN_TITLE,
+    )
+    if args.tcp:
+        host, port = args.tcp.rsplit(":", 1)
+        server = CommandServer(controller, host=host, port=int(port))
+    else:
+        server = CommandServer(controller, path=args.unix or DEFAULT_SOCKET)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.shutdown()
+
+
+if __name__ == "__main__":
+    main()
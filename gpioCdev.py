@@ -0,0 +1,324 @@
+"""
+基于 Linux GPIO 字符设备（uAPI v2 ioctl）的 GPIO 后端，接口与 RPi.GPIO 相同
+所有已 setup 的引脚在第一次读写时用一次 GPIO_V2_GET_LINE 请求，之后任意引脚子集
+的电平由一次 GPIO_V2_LINE_SET_VALUES 同时设置，步进电机各相与多路开关量原子切换
+
+RIG_BACKEND=cdev 选择此后端，RIG_GPIO_CHIP 指定设备（默认 /dev/gpiochip0，
+树莓派 5 为 /dev/gpiochip4），引脚号即 BCM 编号（芯片内的 line offset）
+
+没有树莓派时可用 gpio-sim 创建模拟芯片测试：
+    modprobe gpio-sim
+    mkdir -p /sys/kernel/config/gpio-sim/rig/gpio-bank0
+    echo 28 > /sys/kernel/config/gpio-sim/rig/gpio-bank0/num_lines
+    echo 1 > /sys/kernel/config/gpio-sim/rig/live
+    cat /sys/kernel/config/gpio-sim/rig/gpio-bank0/chip_name
+    RIG_GPIO_CHIP=/dev/gpiochipN python gpioCdev.py
+（或 modprobe gpio-mockup gpio_mockup_ranges=-1,28）
+"""
+import ctypes
+import fcntl
+import os
+import threading
+import time
+
+GPIO_MAX_NAME_SIZE = 32
+GPIO_V2_LINES_MAX = 64
+GPIO_V2_LINE_NUM_ATTRS_MAX = 10
+
+GPIO_V2_LINE_FLAG_USED = 1 << 0
+GPIO_V2_LINE_FLAG_INPUT = 1 << 2
+GPIO_V2_LINE_FLAG_OUTPUT = 1 << 3
+GPIO_V2_LINE_FLAG_BIAS_PULL_UP = 1 << 8
+GPIO_V2_LINE_FLAG_BIAS_PULL_DOWN = 1 << 9
+GPIO_V2_LINE_FLAG_BIAS_DISABLED = 1 << 10
+
+GPIO_V2_LINE_ATTR_ID_FLAGS = 1
+GPIO_V2_LINE_ATTR_ID_OUTPUT_VALUES = 2
+
+CONSUMER = b"rotateController"
+
+
+class gpiochip_info(ctypes.Structure):
+    _fields_ = [
+        ("name", ctypes.c_char * GPIO_MAX_NAME_SIZE),
+        ("label", ctypes.c_char * GPIO_MAX_NAME_SIZE),
+        ("lines", ctypes.c_uint32),
+    ]
+
+
+class gpio_v2_line_attribute(ctypes.Structure):
+    _fields_ = [
+        ("id", ctypes.c_uint32),
+        ("padding", ctypes.c_uint32),
+        ("value", ctypes.c_uint64),  # flags / values / debounce_period_us
+    ]
+
+
+class gpio_v2_line_config_attribute(ctypes.Structure):
+    _fields_ = [("attr", gpio_v2_line_attribute), ("mask", ctypes.c_uint64)]
+
+
+class gpio_v2_line_config(ctypes.Structure):
+    _fields_ = [
+        ("flags", ctypes.c_uint64),
+        ("num_attrs", ctypes.c_uint32),
+        ("padding", ctypes.c_uint32 * 5),
+        ("attrs", gpio_v2_line_config_attribute * GPIO_V2_LINE_NUM_ATTRS_MAX),
+    ]
+
+
+class gpio_v2_line_request(ctypes.Structure):
+    _fields_ = [
+        ("offsets", ctypes.c_uint32 * GPIO_V2_LINES_MAX),
+        ("consumer", ctypes.c_char * GPIO_MAX_NAME_SIZE),
+        ("config", gpio_v2_line_config),
+        ("num_lines", ctypes.c_uint32),
+        ("event_buffer_size", ctypes.c_uint32),
+        ("padding", ctypes.c_uint32 * 5),
+        ("fd", ctypes.c_int32),
+    ]
+
+
+class gpio_v2_line_values(ctypes.Structure):
+    _fields_ = [("bits", ctypes.c_uint64), ("mask", ctypes.c_uint64)]
+
+
+class gpio_v2_line_info(ctypes.Structure):
+    _fields_ = [
+        ("name", ctypes.c_char * GPIO_MAX_NAME_SIZE),
+        ("consumer", ctypes.c_char * GPIO_MAX_NAME_SIZE),
+        ("offset", ctypes.c_uint32),
+        ("num_attrs", ctypes.c_uint32),
+        ("flags", ctypes.c_uint64),
+        ("attrs", gpio_v2_line_attribute * GPIO_V2_LINE_NUM_ATTRS_MAX),
+        ("padding", ctypes.c_uint32 * 4),
+    ]
+
+
+def _ioc(direction, nr, struct):
+    return direction << 30 | ctypes.sizeof(struct) << 16 | 0xB4 << 8 | nr
+
+
+_IOR, _IOWR = 2, 3
+GPIO_GET_CHIPINFO_IOCTL = _ioc(_IOR, 0x01, gpiochip_info)
+GPIO_V2_GET_LINEINFO_IOCTL = _ioc(_IOWR, 0x05, gpio_v2_line_info)
+GPIO_V2_GET_LINE_IOCTL = _ioc(_IOWR, 0x07, gpio_v2_line_request)
+GPIO_V2_LINE_GET_VALUES_IOCTL = _ioc(_IOWR, 0x0E, gpio_v2_line_values)
+GPIO_V2_LINE_SET_VALUES_IOCTL = _ioc(_IOWR, 0x0F, gpio_v2_line_values)
+
+
+class CdevGPIO:
+    """
+    RPi.GPIO 接口的字符设备实现
+    """
+
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    SERIAL = 40
+    SPI = 41
+    I2C = 42
+    HARD_PWM = 43
+    UNKNOWN = -1
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("RIG_GPIO_CHIP", "/dev/gpiochip0")
+        self.chip_fd = os.open(self.path, os.O_RDWR | os.O_CLOEXEC)
+        info = gpiochip_info()
+        fcntl.ioctl(self.chip_fd, GPIO_GET_CHIPINFO_IOCTL, info)
+        self.chip_name = info.name.decode()
+        self.num_lines = info.lines
+        self.mode = None
+        self.lines = {}  # pin -> (方向, 上下拉, 电平)，按 setup 顺序排列
+        self.bits = {}  # pin -> 在当前请求中的位序号
+        self.masks = {}  # 引脚 tuple -> [位]，output 调用时复用
+        self.request_fd = None
+        self._dirty = False  # setup 后尚未重新请求
+        self._lock = threading.Lock()
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def getmode(self):
+        return self.mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, channel, direction, pull_up_down=None, initial=None):
+        """
+        只记录配置，第一次读写时所有引脚一起请求
+        """
+        for pin in self._pins(channel):
+            if not 0 <= pin < self.num_lines:
+                raise ValueError("Line %s not on %s" % (pin, self.chip_name))
+            level = 1 if initial else 0
+            self.lines[pin] = (direction, pull_up_down, level)
+        self._dirty = True
+
+    def gpio_function(self, pin):
+        """
+        已 setup 的引脚返回配置的方向，其他引脚查询内核中的线路信息
+        """
+        if pin in self.lines:
+            return self.lines[pin][0]
+        info = gpio_v2_line_info(offset=pin)
+        fcntl.ioctl(self.chip_fd, GPIO_V2_GET_LINEINFO_IOCTL, info)
+        if not info.flags & GPIO_V2_LINE_FLAG_USED:
+            return self.UNKNOWN
+        if info.flags & GPIO_V2_LINE_FLAG_OUTPUT:
+            return self.OUT
+        return self.IN
+
+    def output(self, channel, value):
+        """
+        所有引脚在一次 ioctl 中设置
+        """
+        if self._dirty:
+            self._request()
+        key = channel if isinstance(channel, int) else tuple(channel)
+        bits = self.masks.get(key)
+        if bits is None:
+            bits = self.masks[key] = [self.bits[pin] for pin in self._pins(channel)]
+        values = gpio_v2_line_values()
+        if isinstance(value, (list, tuple)):
+            for bit, level in zip(bits, value):
+                values.mask |= 1 << bit
+                if level:
+                    values.bits |= 1 << bit
+        else:
+            for bit in bits:
+                values.mask |= 1 << bit
+            if value:
+                values.bits = values.mask
+        fcntl.ioctl(self.request_fd, GPIO_V2_LINE_SET_VALUES_IOCTL, values)
+
+    def input(self, pin):
+        if self._dirty:
+            self._request()
+        bit = self.bits[pin]
+        values = gpio_v2_line_values(mask=1 << bit)
+        fcntl.ioctl(self.request_fd, GPIO_V2_LINE_GET_VALUES_IOCTL, values)
+        return (values.bits >> bit) & 1
+
+    def cleanup(self, channel=None):
+        """
+        释放线路，内核将其恢复为输入
+        """
+        if channel is None:
+            self.lines.clear()
+        else:
+            for pin in self._pins(channel):
+                self.lines.pop(pin, None)
+        self._release()
+        self._dirty = bool(self.lines)
+
+    def close(self):
+        self.cleanup()
+        os.close(self.chip_fd)
+
+    def _request(self):
+        """
+        按当前配置一次请求全部线路；重新请求时输出保持当前电平
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            current = {}
+            if self.request_fd is not None:
+                values = gpio_v2_line_values(mask=(1 << len(self.bits)) - 1)
+                fcntl.ioctl(self.request_fd, GPIO_V2_LINE_GET_VALUES_IOCTL, values)
+                for pin, bit in self.bits.items():
+                    current[pin] = (values.bits >> bit) & 1
+            self._release()
+            pins = list(self.lines)
+            if len(pins) > GPIO_V2_LINES_MAX:
+                raise ValueError("At most %s lines per request" % GPIO_V2_LINES_MAX)
+            request = gpio_v2_line_request()
+            request.consumer = CONSUMER
+            request.num_lines = len(pins)
+            request.config.flags = GPIO_V2_LINE_FLAG_OUTPUT
+            attrs = {}  # flags -> mask，输出以外的配置按相同 flags 合并为属性
+            values = gpio_v2_line_values()
+            for bit, pin in enumerate(pins):
+                request.offsets[bit] = pin
+                direction, pull, level = self.lines[pin]
+                if direction == self.IN:
+                    flags = GPIO_V2_LINE_FLAG_INPUT
+                    if pull == self.PUD_UP:
+                        flags |= GPIO_V2_LINE_FLAG_BIAS_PULL_UP
+                    elif pull == self.PUD_DOWN:
+                        flags |= GPIO_V2_LINE_FLAG_BIAS_PULL_DOWN
+                    elif pull == self.PUD_OFF:
+                        flags |= GPIO_V2_LINE_FLAG_BIAS_DISABLED
+                    attrs[flags] = attrs.get(flags, 0) | 1 << bit
+                else:
+                    values.mask |= 1 << bit
+                    if current.get(pin, level):
+                        values.bits |= 1 << bit
+            config = request.config
+            for flags, mask in attrs.items():
+                attr = config.attrs[config.num_attrs]
+                attr.attr.id = GPIO_V2_LINE_ATTR_ID_FLAGS
+                attr.attr.value = flags
+                attr.mask = mask
+                config.num_attrs += 1
+            if values.mask:
+                attr = config.attrs[config.num_attrs]
+                attr.attr.id = GPIO_V2_LINE_ATTR_ID_OUTPUT_VALUES
+                attr.attr.value = values.bits
+                attr.mask = values.mask
+                config.num_attrs += 1
+            fcntl.ioctl(self.chip_fd, GPIO_V2_GET_LINE_IOCTL, request)
+            self.request_fd = request.fd
+            self.bits = {pin: bit for bit, pin in enumerate(pins)}
+            self.masks = {}
+            self._dirty = False
+
+    def _release(self):
+        if self.request_fd is not None:
+            os.close(self.request_fd)
+            self.request_fd = None
+            self.bits = {}
+            self.masks = {}
+
+    def _pins(self, channel):
+        return list(channel) if isinstance(channel, (list, tuple)) else [channel]
+
+
+def main():
+    """
+    自检：请求一组输出线路，逐一与整体翻转并读回，输出单次 output 的耗时
+    """
+    gpio = CdevGPIO()
+    pins = list(range(min(gpio.num_lines, 8)))
+    print("%s: %s lines, testing %s" % (gpio.chip_name, gpio.num_lines, pins))
+    gpio.setmode(gpio.BCM)
+    gpio.setup(pins, gpio.OUT, initial=gpio.LOW)
+    try:
+        for pin in pins:
+            gpio.output(pin, gpio.HIGH)
+            assert gpio.input(pin) == gpio.HIGH, "Line %s stuck low" % pin
+            gpio.output(pin, gpio.LOW)
+            assert gpio.input(pin) == gpio.LOW, "Line %s stuck high" % pin
+        pattern = [i % 2 for i in range(len(pins))]
+        gpio.output(pins, pattern)
+        assert [gpio.input(pin) for pin in pins] == pattern, "Pattern mismatch"
+        rounds = 10000
+        started = time.perf_counter_ns()
+        for i in range(rounds):
+            gpio.output(pins, i & 1)
+        elapsed = time.perf_counter_ns() - started
+        print("OK, %.2f us per %s-line output" % (elapsed / rounds / 1000, len(pins)))
+    finally:
+        gpio.close()
+
+
+if __name__ == "__main__":
+    main()
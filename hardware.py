@@ -0,0 +1,162 @@
+"""
+硬件后端选择：rpi 使用 RPi.GPIO、smbus 与内核硬件 PWM，sim 使用内存模拟器，
+cdev 的 GPIO 使用 Linux GPIO 字符设备（gpioCdev），其余同 rpi
+通过环境变量 RIG_BACKEND 选择，默认 rpi
+"""
+import os
+import threading
+import time
+
+BACKEND = os.environ.get("RIG_BACKEND", "rpi")
+I2C_CLOCK_HZ = int(os.environ.get("RIG_I2C_CLOCK_HZ", 100_000))  # 模拟器总线时钟
+
+_sim_gpio = None
+_cdev_gpio = None
+_buses = {}  # bus_id -> SharedBus
+_buses_lock = threading.Lock()
+
+
+class SharedBus:
+    """
+    同一条 I2C 总线的共享句柄，每次传输持有总线锁，多个设备、多个线程可以安全共用
+    """
+
+    def __init__(self, bus_id, raw):
+        self.bus_id = bus_id
+        self.raw = raw
+        self.lock = threading.RLock()
+
+    def write_byte_data(self, address, reg, value):
+        with self.lock:
+            self.raw.write_byte_data(address, reg, value)
+
+    def write_i2c_block_data(self, address, reg, values):
+        with self.lock:
+            self.raw.write_i2c_block_data(address, reg, values)
+
+    def read_byte_data(self, address, reg):
+        with self.lock:
+            return self.raw.read_byte_data(address, reg)
+
+    def read_i2c_block_data(self, address, reg, length):
+        with self.lock:
+            return self.raw.read_i2c_block_data(address, reg, length)
+
+    def __getattr__(self, name):
+        # 模拟器的统计字段等直接转发
+        return getattr(self.raw, name)
+
+
+class SysfsPWM:
+    """
+    内核硬件 PWM 通道（/sys/class/pwm），树莓派需启用 pwm 或 pwm-2chan dtoverlay，
+    pwmchip0 的 pwm0 / pwm1 默认输出在 GPIO18 / GPIO19
+    """
+
+    EXPORT_TIMEOUT = 1.0  # 等待 udev 设置导出节点权限的时间，单位秒
+
+    def __init__(self, chip=0, channel=0):
+        self.chip = chip
+        self.channel = channel
+        root = "/sys/class/pwm/pwmchip%d" % chip
+        self.path = "%s/pwm%d" % (root, channel)
+        if not os.path.exists(self.path):
+            self._write(root + "/export", channel)
+        deadline = time.monotonic() + self.EXPORT_TIMEOUT
+        while not os.access(self.path + "/enable", os.W_OK):
+            if time.monotonic() > deadline:
+                raise RuntimeError("PWM channel not writable: %s" % self.path)
+            time.sleep(0.01)
+        self.enabled = self._read("enable") == 1
+        self.period_ns = self._read("period")
+        self.duty_ns = self._read("duty_cycle")
+
+    def _write(self, path, value):
+        with open(path, "w") as f:
+            f.write(str(value))
+
+    def _read(self, name):
+        with open("%s/%s" % (self.path, name)) as f:
+            return int(f.read())
+
+    def configure(self, period_ns, duty_ns):
+        """
+        设置周期与高电平时间；驱动要求 duty <= period，因此先清零 duty，
+        写入后读回驱动实际采用的值
+        """
+        self.disable()
+        self._write(self.path + "/duty_cycle", 0)
+        self._write(self.path + "/period", int(period_ns))
+        self._write(self.path + "/duty_cycle", int(duty_ns))
+        self.period_ns = self._read("period")
+        self.duty_ns = self._read("duty_cycle")
+
+    def enable(self):
+        """
+        开始输出，返回启用时刻（perf_counter ns）
+        """
+        self._write(self.path + "/enable", 1)
+        self.enabled = True
+        return time.perf_counter_ns()
+
+    def disable(self):
+        if self.enabled:
+            self._write(self.path + "/enable", 0)
+            self.enabled = False
+
+    def close(self):
+        self.disable()
+
+
+def load_gpio(backend=None):
+    """
+    返回 GPIO 模块（或接口相同的对象）
+    """
+    global _sim_gpio, _cdev_gpio
+    backend = backend or BACKEND
+    if backend == "sim":
+        if _sim_gpio is None:
+            from simulator import SimGPIO
+
+            _sim_gpio = SimGPIO()
+        return _sim_gpio
+    if backend == "cdev":
+        if _cdev_gpio is None:
+            from gpioCdev import CdevGPIO
+
+            _cdev_gpio = CdevGPIO()
+        return _cdev_gpio
+    import RPi.GPIO as GPIO
+
+    return GPIO
+
+
+def open_smbus(bus_id=1, backend=None):
+    """
+    打开 I2C 总线，同一总线号在进程内只打开一次，返回共享的 SharedBus
+    """
+    backend = backend or BACKEND
+    with _buses_lock:
+        if bus_id not in _buses:
+            if backend == "sim":
+                from simulator import SimSMBus
+
+                raw = SimSMBus(bus_id, clock_hz=I2C_CLOCK_HZ)
+            else:
+                import smbus
+
+                raw = smbus.SMBus(bus_id)
+            _buses[bus_id] = SharedBus(bus_id, raw)
+        return _buses[bus_id]
+
+
+def open_pwm(chip=0, channel=0, backend=None):
+    """
+    打开硬件 PWM 通道，接口见 SysfsPWM
+    """
+    backend = backend or BACKEND
+    if backend == "sim":
+        from simulator import SimPWM
+
+        return SimPWM(chip, channel)
+    return SysfsPWM(chip, channel)
@@ -0,0 +1,351 @@
+import itertools
+import logging
+import math
+import queue
+import threading
+import time
+from array import array
+from concurrent.futures import Future
+
+from timing import TimingRecorder, sleep_until
+from tracer import STEP, TRACER
+
+logger = logging.getLogger(name="Motion")
+
+
+class MotionProfile:
+    """
+    梯形加减速参数：起步速度、最高速度（拍/秒），加速度（拍/秒²）
+    """
+
+    def __init__(self, start_speed, max_speed, acceleration):
+        self.start_speed = start_speed
+        self.max_speed = max(max_speed, start_speed)
+        self.acceleration = acceleration
+
+    def ramp_steps(self):
+        """
+        从起步速度加速到最高速度需要的拍数
+        """
+        if self.acceleration <= 0:
+            return 0
+        return math.ceil(
+            (self.max_speed ** 2 - self.start_speed ** 2) / (2 * self.acceleration)
+        )
+
+    def delays(self, steps):
+        """
+        预先计算每一拍之后的等待时间（ns）：加速 - 匀速 - 减速，
+        拍数不足时为三角形曲线
+        """
+        delays = array("q", bytes(8 * steps))
+        v0_squared = self.start_speed ** 2
+        for i in range(steps):
+            # 距离最近一端的拍数决定该拍速度，加减速对称
+            distance = min(i, steps - 1 - i)
+            speed = math.sqrt(v0_squared + 2 * self.acceleration * distance)
+            delays[i] = int(1e9 / min(speed, self.max_speed))
+        return delays
+
+
+def constant_delays(steps, interval):
+    """
+    匀速运动的等待时间表（ns），interval 单位秒
+    """
+    return array("q", [int(interval * 1e9)]) * steps
+
+
+def compile_sequence(seq):
+    """
+    把步进序列编译为不可变的 tuple 表，运动中直接作为输出值使用
+    """
+    return tuple(tuple(row) for row in seq)
+
+
+class AxisTrack:
+    """
+    运动中单个轴的参数
+    """
+
+    def __init__(self, axis, pins, seq, steps, direction, step_size=1):
+        self.axis = axis
+        self.pins = tuple(pins)
+        self.seq = compile_sequence(seq) if not isinstance(seq, tuple) else seq
+        self.steps = steps
+        self.direction = direction  # 1 顺时针，-1 逆时针
+        self.step_size = step_size  # 每拍对应的半步数，整步/单相序列为 2
+        self.delta = ((axis, direction * step_size),)
+
+
+def plan_frames(tracks):
+    """
+    DDA 插补：主轴（拍数最多）每个节拍走一步，其余轴按比例均匀插入，
+    每个节拍所有走步的轴合并为一次输出
+    返回 [(pins, values, ((axis, half_steps), ...)), ...]
+    """
+    if len(tracks) == 1:
+        track = tracks[0]
+        return list(
+            zip(
+                itertools.repeat(track.pins),
+                itertools.islice(itertools.cycle(track.seq), track.steps),
+                itertools.repeat(track.delta),
+            )
+        )
+    ticks = max(track.steps for track in tracks)
+    accs = [ticks // 2] * len(tracks)
+    cycles = [itertools.cycle(track.seq) for track in tracks]
+    frames = []
+    for _ in range(ticks):
+        pins = ()
+        values = ()
+        deltas = ()
+        for i, track in enumerate(tracks):
+            accs[i] += track.steps
+            if accs[i] < ticks:
+                continue
+            accs[i] -= ticks
+            pins += track.pins
+            values += next(cycles[i])
+            deltas += track.delta
+        frames.append((pins, values, deltas))
+    return frames
+
+
+class StepperMove:
+    """
+    单次步进电机运动指令，可包含多个轴
+    """
+
+    def __init__(self, frames, delays, tracks=()):
+        self.tracks = tracks
+        self.frames = frames  # 每一拍的输出，见 plan_frames
+        self.delays = delays  # 每一拍之后的等待时间（ns），运动开始前计算好
+        self.steps = len(delays)
+        self.done = 0  # 已执行的拍数，运动异常结束时用于修正目标位置
+        self.generation = 0  # 规划时引擎的取消代数
+        self.future = Future()
+        self.stop_event = threading.Event()
+
+    def totals(self, start=0):
+        """
+        从第 start 拍开始各轴的位移合计
+        """
+        totals = {}
+        for _, _, deltas in self.frames[start:]:
+            for axis, half_steps in deltas:
+                totals[axis] = totals.get(axis, 0) + half_steps
+        return totals
+
+
+class StepperEngine:
+    """
+    步进电机运动引擎：独立线程按队列顺序执行运动指令，调用方立即返回 Future
+    """
+
+    def __init__(self, output):
+        """
+        output: 引脚输出函数，签名同 GPIO.output(pins, values)
+        """
+        self.output = output
+        self.queue = queue.Queue()
+        self.position = {}  # 各轴当前位置（半步数），顺时针为正
+        self.target = {}  # 排队运动全部完成后各轴的位置（半步数）
+        self.timing = TimingRecorder()  # 每一拍的目标时刻与实际时刻
+        self._current = None
+        self._pending = 0  # 已提交且尚未结束的运动数
+        self._generation = 0  # 每次取消全部时加一，之前提交的运动都不再执行
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="StepperEngine", daemon=True
+        )
+        self._thread.start()
+
+    def submit(
+        self,
+        axis,
+        pins,
+        seq,
+        steps,
+        direction,
+        interval=None,
+        profile=None,
+        step_size=1,
+    ):
+        """
+        加入一次单轴运动，返回 Future，结果为实际执行的拍数
+        profile 为 MotionProfile 时按梯形加减速运动，否则以 interval 匀速运动
+        """
+        return self.submit_coordinated(
+            [AxisTrack(axis, pins, seq, steps, direction, step_size)],
+            interval=interval,
+            profile=profile,
+        )
+
+    def submit_coordinated(self, tracks, interval=None, profile=None):
+        """
+        加入一次多轴联动，各轴在同一个节拍循环中插补，耗时取决于拍数最多的轴
+        """
+        return self.submit_move(self.plan(tracks, interval=interval, profile=profile))
+
+    def plan(self, tracks, interval=None, profile=None):
+        """
+        只生成运动（输出帧与等待时间）而不加入队列，可在等待期间提前规划下一次运动
+        规划之后发生的取消全部同样作废这次运动，提交后不会执行
+        """
+        tracks = [track for track in tracks if track.steps > 0]
+        frames = plan_frames(tracks) if tracks else []
+        if profile is not None:
+            delays = profile.delays(len(frames))
+        else:
+            delays = constant_delays(len(frames), interval)
+        move = StepperMove(frames, delays, tracks)
+        move.generation = self._generation
+        return move
+
+    def submit_move(self, move):
+        """
+        加入已规划好的运动，返回 Future
+        """
+        with self._lock:
+            for track in move.tracks:
+                self.position.setdefault(track.axis, 0)
+                self.target[track.axis] = (
+                    self.target.get(track.axis, 0)
+                    + track.steps * track.direction * track.step_size
+                )
+            self._pending += 1
+        self.queue.put(move)
+        return move.future
+
+    def cancel(self, future=None):
+        """
+        取消指定运动；future 为 None 时取消全部排队及正在执行的运动
+        """
+        with self._lock:
+            current = self._current
+            if future is None:
+                # 已出队但尚未开始的运动由 _run 按代数丢弃
+                self._generation += 1
+        if future is None:
+            while True:
+                try:
+                    move = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if move is not None:
+                    # 出队后 _run 不会再看到这次运动，在这里扣除它的目标位置
+                    move.future.cancel()
+                    self._forget(move, 0)
+                else:
+                    self.queue.put(None)
+                    break
+            if current is not None:
+                current.stop_event.set()
+            return True
+        if current is not None and current.future is future:
+            current.stop_event.set()
+            return True
+        return future.cancel()
+
+    def get_position(self, axis):
+        """
+        查询某轴当前位置（半步数）
+        """
+        with self._lock:
+            return self.position.get(axis, 0)
+
+    def get_target(self, axis):
+        """
+        查询某轴在排队运动全部完成后的位置（半步数）
+        """
+        with self._lock:
+            return self.target.get(axis, 0)
+
+    def busy(self):
+        """
+        是否有正在执行或排队的运动
+        """
+        with self._lock:
+            return self._pending > 0
+
+    def stop(self, timeout=None):
+        """
+        取消全部运动并结束线程
+        """
+        self.cancel()
+        self.queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            move = self.queue.get()
+            if move is None:
+                return
+            # 出队与发布 _current 之间的取消全部由代数判断
+            with self._lock:
+                stale = move.generation != self._generation
+                if not stale:
+                    self._current = move
+            if stale:
+                move.future.cancel()
+            if not move.future.set_running_or_notify_cancel():
+                with self._lock:
+                    self._current = None
+                self._forget(move, 0)
+                continue
+            error = None
+            try:
+                done = self._execute(move)
+            except Exception as e:
+                logger.exception("Move failed")
+                done = move.done
+                error = e
+            # 先修正目标位置与 busy 状态，Future 回调中看到的已是运动结束后的状态
+            with self._lock:
+                self._current = None
+            self._forget(move, done)
+            if error is not None:
+                move.future.set_exception(error)
+            else:
+                move.future.set_result(done)
+
+    def _forget(self, move, done):
+        """
+        运动结束（含取消、中断），从目标位置中扣除未执行的部分
+        """
+        totals = move.totals(done) if done < move.steps else {}
+        with self._lock:
+            self._pending -= 1
+            for axis, total in totals.items():
+                self.target[axis] -= total
+
+    def _execute(self, move):
+        """
+        逐拍输出，返回实际执行的拍数
+        每一拍的时刻由起始时刻累加等待时间得到，不会因单次唤醒延迟而累积误差
+        """
+        frames = move.frames
+        delays = move.delays
+        record = self.timing.record
+        position = self.position
+        done = 0
+        deadline = time.perf_counter_ns()
+        while done < move.steps and not move.stop_event.is_set():
+            pins, values, deltas = frames[done]
+            actual = sleep_until(deadline)
+            if pins:
+                self.output(pins, values)
+            record(deadline, actual)
+            with self._lock:
+                for axis, half_steps in deltas:
+                    position[axis] += half_steps
+            if TRACER.enabled:
+                for axis, _ in deltas:
+                    TRACER.record(STEP, TRACER.intern(axis), position[axis])
+            deadline += delays[done]
+            done += 1
+            move.done = done
+        # 最后一拍同样保持完整的间隔
+        sleep_until(deadline)
+        return done
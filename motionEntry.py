@@ -0,0 +1,24 @@
+"""
+运动进程的最小入口，由 motionWorker.start_worker 以独立解释器启动
+先绑定 CPU 再导入运动模块，之后产生的内存与线程都在隔离核心上；
+只导入 motionWorker 及其依赖，不会重新导入界面模块（pygame）
+
+参数：一个 JSON 数组 [命令环名, 状态环名, cpu, fifo_priority, lock_memory, backend]
+"""
+import json
+import os
+import sys
+
+
+def main(argv):
+    args = json.loads(argv[1])
+    cpu = args[2]
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    from motionWorker import run_worker
+
+    run_worker(*args)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
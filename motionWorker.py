@@ -0,0 +1,493 @@
+"""
+实时运动进程：步进电机的节拍输出在独立进程中执行，可绑定到隔离的 CPU 核心
+（内核参数 isolcpus=3），可选 SCHED_FIFO 与 mlockall，界面进程的渲染、日志和 GC
+不再影响步进时序
+
+进程之间通过 multiprocessing.shared_memory 上的两个单生产者单消费者环形缓冲区通信：
+命令环（界面 -> 运动进程）与状态环（运动进程 -> 界面），读写都不加锁，
+发布与读取序号前后用 memory_barrier 保证内存顺序
+MotionProcess 的接口与 motion.StepperEngine 相同，可直接替换
+
+PCA9685 仍由界面进程驱动：影子寄存器只能有一个所有者
+运动进程由 motionEntry 启动，不经过 multiprocessing 的 spawn（spawn 会在子进程中
+重新导入界面的 __main__），界面进程退出后运动进程自行退出
+"""
+import ctypes
+import gc
+import itertools
+import json
+import logging
+import os
+import struct
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import resource_tracker, shared_memory
+
+from motion import AxisTrack, MotionProfile, StepperEngine
+
+logger = logging.getLogger(name="MotionWorker")
+
+RING_SLOTS = 256
+RING_SLOT_SIZE = 4096
+POLL_INTERVAL = 0.5 / 1000  # 环为空时的轮询间隔，单位秒
+POSITION_INTERVAL = 20 / 1000  # 运动中回报位置的间隔，单位秒
+IDLE_GC_INTERVAL = 5  # 空闲时手动 GC 的间隔，单位秒
+REPLY_TIMEOUT = 1.0  # 等待运动进程应答的时间，单位秒
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+WORKER_ENTRY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "motionEntry.py"
+)
+
+_libc = ctypes.CDLL(None)
+# 进程私有互斥量，只用于屏障；glibc 的 PTHREAD_MUTEX_INITIALIZER 为全零
+_barrier_mutex = ctypes.create_string_buffer(64)
+
+
+def memory_barrier():
+    """
+    内存屏障：屏障之前的读写不会被重排到之后，之后的读写也不会提前到之前
+    ARM 核心上普通的共享内存读写可以乱序，ctypes 又无法调用 __sync_synchronize
+    这类编译器内建函数；POSIX 规定 pthread_mutex_lock / unlock 同步内存，
+    一次加锁解锁即为完整的获取 + 释放屏障
+    """
+    _libc.pthread_mutex_lock(_barrier_mutex)
+    _libc.pthread_mutex_unlock(_barrier_mutex)
+
+
+class ShmRing:
+    """
+    共享内存环形缓冲区，一个生产者、一个消费者
+    头部：写序号（偏移 0）、槽数、槽大小，读序号在独立的缓存行（偏移 64）
+    每个槽：序号 + 长度 + 数据
+    生产者写完槽后经屏障再发布写序号，消费者读到写序号后经屏障再读槽，
+    读完经屏障再发布读序号，因此不会读到尚未写完的槽，也不会覆盖尚未读完的槽
+    """
+
+    HEADER = 128
+    HEAD = struct.Struct("<QII")  # 写序号，槽数，槽大小
+    INDEX = struct.Struct("<Q")  # 单独读写写序号 / 读序号
+    SLOT = struct.Struct("<QI")  # 槽序号（写序号 + 1），数据长度
+    created = set()  # 本进程创建的共享内存名
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.buf = shm.buf
+        self.owner = owner
+        _, self.slots, self.slot_size = self.HEAD.unpack_from(self.buf, 0)
+        self.capacity = self.slot_size - self.SLOT.size
+
+    @classmethod
+    def create(cls, slots=RING_SLOTS, slot_size=RING_SLOT_SIZE):
+        shm = shared_memory.SharedMemory(
+            create=True, size=cls.HEADER + slots * slot_size
+        )
+        cls.HEAD.pack_into(shm.buf, 0, 0, slots, slot_size)
+        cls.INDEX.pack_into(shm.buf, 64, 0)
+        cls.created.add(shm.name)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        shm = shared_memory.SharedMemory(name=name)
+        if name not in cls.created:
+            # 运动进程有自己的 resource_tracker，退出时会删除仍登记的共享内存；
+            # 共享内存由创建方负责删除，这里取消登记
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def put(self, payload):
+        """
+        写入一条消息，环满时返回 False
+        """
+        if len(payload) > self.capacity:
+            raise ValueError("Message too large: %s bytes" % len(payload))
+        (head,) = self.INDEX.unpack_from(self.buf, 0)
+        (tail,) = self.INDEX.unpack_from(self.buf, 64)
+        if head - tail >= self.slots:
+            return False
+        offset = self.HEADER + (head % self.slots) * self.slot_size
+        start = offset + self.SLOT.size
+        self.buf[start : start + len(payload)] = payload
+        self.SLOT.pack_into(self.buf, offset, head + 1, len(payload))
+        memory_barrier()  # 槽内容先于写序号可见
+        self.INDEX.pack_into(self.buf, 0, head + 1)
+        return True
+
+    def get(self):
+        """
+        读取一条消息，没有时返回 None
+        """
+        (tail,) = self.INDEX.unpack_from(self.buf, 64)
+        (head,) = self.INDEX.unpack_from(self.buf, 0)
+        if tail == head:
+            return None
+        memory_barrier()  # 读到写序号之后才读取槽内容
+        offset = self.HEADER + (tail % self.slots) * self.slot_size
+        seq, length = self.SLOT.unpack_from(self.buf, offset)
+        if seq != tail + 1:
+            return None
+        start = offset + self.SLOT.size
+        payload = bytes(self.buf[start : start + length])
+        memory_barrier()  # 读完槽之后才允许生产者覆盖
+        self.INDEX.pack_into(self.buf, 64, tail + 1)
+        return payload
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.created.discard(self.shm.name)
+            self.shm.unlink()
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode("utf-8")
+
+
+def configure_realtime(cpu=None, fifo_priority=None, lock_memory=False):
+    """
+    绑定 CPU、切换 SCHED_FIFO、锁定内存；之后创建的线程继承调度策略与 CPU 绑定
+    权限不足时只记录警告
+    """
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+        logger.info("Motion worker pinned to CPU %s", cpu)
+    if fifo_priority:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(fifo_priority))
+            logger.info("Motion worker uses SCHED_FIFO priority %s", fifo_priority)
+        except PermissionError:
+            logger.warning("SCHED_FIFO not permitted, need CAP_SYS_NICE")
+    if lock_memory:
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+            logger.warning("mlockall failed: %s", os.strerror(ctypes.get_errno()))
+
+
+def start_worker(*args):
+    """
+    以 motionEntry 启动运动进程，参数同 run_worker
+    """
+    return subprocess.Popen([sys.executable, WORKER_ENTRY, json.dumps(args)])
+
+
+def run_worker(command_name, status_name, cpu, fifo_priority, lock_memory, backend):
+    """
+    运动进程主循环，由 motionEntry 调用
+    """
+    parent = os.getppid()
+    logging.basicConfig(
+        format="%(levelname)s | %(asctime)-15s | %(message)s", level=logging.INFO
+    )
+    configure_realtime(cpu, fifo_priority, lock_memory)
+    from hardware import load_gpio
+
+    gpio = load_gpio(backend)
+    gpio.setmode(gpio.BCM)
+    gpio.setwarnings(False)
+    commands = ShmRing.attach(command_name)
+    status = ShmRing.attach(status_name)
+    status_lock = threading.Lock()  # 引擎线程与主循环都会写状态环
+    engine = StepperEngine(output=gpio.output)
+    futures = {}  # id -> Future
+    pins_ready = set()
+
+    def send(message, wait=True):
+        payload = encode(message)
+        with status_lock:
+            while not status.put(payload):
+                if not wait:
+                    return
+                time.sleep(POLL_INTERVAL)
+
+    def finished(cid, move, future):
+        futures.pop(cid, None)
+        message = {"id": cid}
+        if future.cancelled():
+            done = 0
+            message.update(event="cancelled", result=done)
+        elif future.exception() is not None:
+            done = move.done
+            message.update(event="error", error=repr(future.exception()))
+        else:
+            done = future.result()
+            message.update(event="done", result=done)
+        message["unexecuted"] = move.totals(done) if done < move.steps else {}
+        message["position"] = dict(engine.position)
+        send(message)
+
+    def submit(message):
+        tracks = [AxisTrack(*track) for track in message["tracks"]]
+        for track in tracks:
+            new = [pin for pin in track.pins if pin not in pins_ready]
+            if new:
+                gpio.setup(new, gpio.OUT, initial=gpio.LOW)
+                pins_ready.update(new)
+        profile = message.get("profile")
+        move = engine.plan(
+            tracks,
+            interval=message.get("interval"),
+            profile=MotionProfile(*profile) if profile else None,
+        )
+        cid = message["id"]
+        futures[cid] = move.future
+        engine.submit_move(move).add_done_callback(lambda f: finished(cid, move, f))
+
+    # 初始化产生的对象移出 GC 跟踪，运动中不做自动 GC，空闲时手动回收
+    gc.collect()
+    gc.freeze()
+    gc.disable()
+    last_position = None
+    next_report = 0
+    next_gc = time.monotonic() + IDLE_GC_INTERVAL
+    try:
+        while True:
+            payload = commands.get()
+            if payload is None:
+                now = time.monotonic()
+                busy = engine.busy()
+                if now >= next_report:
+                    if os.getppid() != parent:
+                        logger.warning("UI process exited, stopping motion worker")
+                        break
+                    position = dict(engine.position)
+                    if busy or position != last_position:
+                        send({"event": "position", "position": position}, wait=False)
+                        last_position = position
+                    next_report = now + POSITION_INTERVAL
+                if not busy and now >= next_gc:
+                    gc.collect()
+                    next_gc = now + IDLE_GC_INTERVAL
+                time.sleep(POLL_INTERVAL)
+                continue
+            message = json.loads(payload)
+            cmd = message["cmd"]
+            if cmd == "move":
+                submit(message)
+            elif cmd == "cancel":
+                cid = message.get("id")
+                if cid is None:
+                    engine.cancel()
+                elif cid in futures:
+                    engine.cancel(futures[cid])
+            elif cmd == "halt":
+                engine.cancel()
+                if pins_ready:
+                    gpio.output(sorted(pins_ready), gpio.LOW)
+            elif cmd == "stats":
+                send({"event": "stats", "stats": engine.timing.stats()})
+            elif cmd == "stop":
+                break
+    finally:
+        engine.stop()
+        gpio.cleanup()
+        commands.close()
+        status.close()
+
+
+class RemoteMove:
+    """
+    界面进程中的运动指令：只保存参数，节拍由运动进程生成
+    """
+
+    def __init__(self, tracks, interval, profile):
+        self.tracks = tracks
+        self.interval = interval
+        self.profile = profile
+        self.future = Future()
+
+    def message(self, cid):
+        profile = self.profile
+        return {
+            "cmd": "move",
+            "id": cid,
+            "tracks": [
+                [t.axis, t.pins, t.seq, t.steps, t.direction, t.step_size]
+                for t in self.tracks
+            ],
+            "interval": self.interval,
+            "profile": (
+                [profile.start_speed, profile.max_speed, profile.acceleration]
+                if profile is not None
+                else None
+            ),
+        }
+
+
+class RemoteTiming:
+    """
+    与 TimingRecorder.stats 相同，数据在运动进程中
+    """
+
+    def __init__(self, process):
+        self.process = process
+
+    def stats(self):
+        return self.process.request_stats()
+
+
+class MotionProcess:
+    """
+    运动进程的代理，接口同 StepperEngine
+    """
+
+    def __init__(self, cpu=None, fifo_priority=None, lock_memory=False, backend=None):
+        self.commands = ShmRing.create()
+        self.status = ShmRing.create()
+        self.position = {}  # 运动进程回报的各轴位置（半步数）
+        self.target = {}
+        self.timing = RemoteTiming(self)
+        self.pending = {}  # id -> RemoteMove
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()  # 命令环只能有一个生产者
+        self._stats = {"count": 0, "mean_us": 0.0, "std_us": 0.0, "max_us": 0.0}
+        self._stats_event = threading.Event()
+        self._running = True
+        self.process = start_worker(
+            self.commands.name,
+            self.status.name,
+            cpu,
+            fifo_priority,
+            lock_memory,
+            backend,
+        )
+        self._thread = threading.Thread(
+            target=self._poll, name="MotionStatus", daemon=True
+        )
+        self._thread.start()
+
+    def _send(self, message):
+        payload = encode(message)
+        while not self.commands.put(payload):
+            time.sleep(POLL_INTERVAL)
+
+    def submit(
+        self,
+        axis,
+        pins,
+        seq,
+        steps,
+        direction,
+        interval=None,
+        profile=None,
+        step_size=1,
+    ):
+        return self.submit_coordinated(
+            [AxisTrack(axis, pins, seq, steps, direction, step_size)],
+            interval=interval,
+            profile=profile,
+        )
+
+    def submit_coordinated(self, tracks, interval=None, profile=None):
+        return self.submit_move(self.plan(tracks, interval=interval, profile=profile))
+
+    def plan(self, tracks, interval=None, profile=None):
+        tracks = [track for track in tracks if track.steps > 0]
+        return RemoteMove(tracks, interval, profile)
+
+    def submit_move(self, move):
+        with self._lock:
+            for track in move.tracks:
+                self.position.setdefault(track.axis, 0)
+                self.target[track.axis] = (
+                    self.target.get(track.axis, 0)
+                    + track.steps * track.direction * track.step_size
+                )
+            cid = next(self._ids)
+            self.pending[cid] = move
+            self._send(move.message(cid))
+        return move.future
+
+    def cancel(self, future=None):
+        with self._lock:
+            if future is None:
+                self._send({"cmd": "cancel"})
+                return True
+            for cid, move in self.pending.items():
+                if move.future is future:
+                    self._send({"cmd": "cancel", "id": cid})
+                    return True
+        return False
+
+    def halt(self):
+        """
+        取消全部运动并把电机引脚拉低
+        """
+        with self._lock:
+            self._send({"cmd": "halt"})
+
+    def request_stats(self):
+        if not self._running:
+            return self._stats  # 进程已退出，返回退出前的统计
+        with self._lock:
+            self._stats_event.clear()
+            self._send({"cmd": "stats"})
+        self._stats_event.wait(REPLY_TIMEOUT)
+        return self._stats
+
+    def get_position(self, axis):
+        with self._lock:
+            return self.position.get(axis, 0)
+
+    def get_target(self, axis):
+        with self._lock:
+            return self.target.get(axis, 0)
+
+    def busy(self):
+        with self._lock:
+            return bool(self.pending)
+
+    def stop(self, timeout=None):
+        self.request_stats()
+        with self._lock:
+            self._send({"cmd": "cancel"})
+            self._send({"cmd": "stop"})
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            logger.warning("Motion worker did not exit in %s s, killing it", timeout)
+            self.process.kill()
+        self._running = False
+        self._thread.join()
+        self.commands.close()
+        self.status.close()
+
+    def _poll(self):
+        while self._running:
+            payload = self.status.get()
+            if payload is None:
+                time.sleep(POLL_INTERVAL)
+                continue
+            self._handle(json.loads(payload))
+
+    def _handle(self, event):
+        kind = event["event"]
+        if kind == "stats":
+            self._stats = event["stats"]
+            self._stats_event.set()
+            return
+        with self._lock:
+            self.position.update(event["position"])
+            if kind == "position":
+                return
+            move = self.pending.pop(event["id"], None)
+            for axis, total in event["unexecuted"].items():
+                self.target[axis] -= total
+        if move is None:
+            return
+        if kind == "cancelled":
+            move.future.cancel()
+        elif kind == "error":
+            move.future.set_exception(
+                RuntimeError("Move failed in motion worker: %s" % event["error"])
+            )
+        else:
+            move.future.set_result(event["result"])
@@ -8,51 +8,79 @@ Description:: Say something
 """
 # Software pulse.py
 # coding=utf-8
+# 脉冲串前端，输出由 pulseTrain.PulseTrainRunner 负责（与 rotateController 共用）
+# 引脚、脉宽与硬件 PWM 见 pulseConfig
+#   python pulse.py --count 200 --freq 40            直接发射一串脉冲并输出统计
+#   python pulse.py --count 20 --freq 40 --hardware  由硬件 PWM 输出
+#   python pulse.py                                  打开窗口，v 键发射一串，a 键中止
 
-import RPi.GPIO as GPIO
-import time
-import pygame
+import argparse
+import json
 
-pygame.init()
-P_pulse = 27  # GPIO0端口号，根据实际修改
-# fPWM = 1  # Hz (软件PWM方式，频率不能设置过高)
-# servo LD-20MG: pulse width is form 0.5ms to 2.5ms
-# period is 20ms, duty is form 2.5% to 12.5%
+from hardware import load_gpio
+from pulseConfig import REACTION_GENERATOR_PIN, SHOOT_INTERVAL
+from pulseTrain import PulseTrainRunner
+
+GPIO = load_gpio()
 
 
 def setup():
-    global pulse1
     GPIO.setmode(GPIO.BCM)  # setup the BCM coding pin
-    GPIO.setup(P_pulse, GPIO.OUT)
-    # pulse1 = GPIO.PWM(P_pulse, fPWM)
-    # pulse1.start(0)
-
-
-def shootPulse():
-    # direction = angle*(a-b)/180
-    # duty = b+direction
-    # duty =
-    # pwm1.ChangeDutyCycle(duty)
-    # print "angle =", angle, "-> duty =", duty
-    # time.sleep(0.5)
-    GPIO.output(P_pulse, GPIO.HIGH)
-    time.sleep(0.01)  # the high level will last 0.01s(10ms)
-    GPIO.output(P_pulse, GPIO.LOW)
-    time.sleep(1)
-
-
-setup()
-screen = pygame.display.set_mode((800, 600))
-while True:
-    # print('1')
-    for event in pygame.event.get():
-        # print('2')
+    GPIO.setup(REACTION_GENERATOR_PIN, GPIO.OUT, initial=GPIO.LOW)
+    return PulseTrainRunner(GPIO.output)
+
+
+def print_report(future):
+    if not future.cancelled() and future.exception() is None:
+        print(json.dumps(future.result()))
+
+
+def interactive(runner, args):
+    import pygame
+
+    pygame.init()
+    pygame.display.set_mode((800, 600))
+    while True:
+        event = pygame.event.wait()
         if event.type == pygame.QUIT:
-            pygame.quit()
-            exit(0)
+            break
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_v:
-                shootPulse()
+                if runner.busy():
+                    print("Pulse train is still running, press a to abort")
+                    continue
+                runner.start(
+                    args.count, args.freq, args.width, args.hardware
+                ).add_done_callback(print_report)
+            elif event.key == pygame.K_a:
+                runner.abort()
             elif event.key == pygame.K_ESCAPE:
-                pygame.quit()
-                exit(0)
+                break
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pulse train")
+    parser.add_argument("--count", type=int, default=None, help="pulses per burst")
+    parser.add_argument("--freq", type=float, default=1, help="Hz")
+    parser.add_argument("--width", type=float, default=SHOOT_INTERVAL, help="seconds")
+    parser.add_argument("--hardware", action="store_true", help="use hardware PWM")
+    args = parser.parse_args()
+
+    runner = setup()
+    try:
+        if args.count is None:
+            args.count = 1
+            interactive(runner, args)
+        else:
+            future = runner.start(args.count, args.freq, args.width, args.hardware)
+            print(json.dumps(future.result(), indent=2))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.close()
+        GPIO.cleanup()
+
+
+if __name__ == "__main__":
+    main()
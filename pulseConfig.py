@@ -0,0 +1,7 @@
+"""
+发生器脉冲配置，rotateController 与 pulse.py 共用
+todo: 需要根据实际情况设置
+"""
+REACTION_GENERATOR_PIN = [5]  # 发生器脉冲控制（BCM）
+SHOOT_INTERVAL = 10 / 1000  # 发射脉冲宽度 10 ms
+PULSE_PWM = (0, 0)  # 脉冲串硬件 PWM (pwmchip, 通道)，输出在 GPIO18，需与发生器并联接线
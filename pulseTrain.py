@@ -0,0 +1,161 @@
+"""
+脉冲串：count 个脉冲，频率 frequency，脉宽 width
+GPIO 输出时每个边沿按绝对时刻对齐，误差不累积；也可交给硬件 PWM 输出，
+CPU 只负责在最后一个脉冲之后的低电平窗口内停止
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hardware import open_pwm
+from pulseConfig import PULSE_PWM, REACTION_GENERATOR_PIN, SHOOT_INTERVAL
+from timing import SPIN_NS, TimingRecorder, sleep_until
+from tracer import PULSE, TRACER, pin_mask
+
+START_DELAY = 1 / 1000  # 提交到第一个上升沿的时间，单位秒
+
+
+class PulseTrain:
+    def __init__(self, count, frequency, width):
+        if count < 1 or frequency <= 0:
+            raise ValueError("Invalid pulse train: %s x %s Hz" % (count, frequency))
+        self.count = int(count)
+        self.frequency = frequency
+        self.width = width
+        self.period_ns = int(round(1e9 / frequency))
+        self.width_ns = int(round(width * 1e9))
+        if not 0 < self.width_ns < self.period_ns:
+            raise ValueError(
+                "Pulse width %s s does not fit in period %s s"
+                % (width, self.period_ns / 1e9)
+            )
+        self.rises = TimingRecorder(self.count)  # 上升沿的目标时刻与实际时刻
+        self.widths = TimingRecorder(self.count)  # 下降沿相对实际上升沿的目标与实际
+        self.source = None
+        self.achieved_period_ns = None  # 硬件 PWM 时为驱动实际采用的周期
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run_gpio(self, output, pins, high=1, low=0):
+        """
+        output: 签名同 GPIO.output(pins, values)，返回统计结果
+        """
+        self.source = "gpio"
+        mask = pin_mask(pins)
+        period_ns = self.period_ns
+        width_ns = self.width_ns
+        rise = time.perf_counter_ns() + int(START_DELAY * 1e9)
+        for _ in range(self.count):
+            if self.stop_event.is_set():
+                break
+            actual_rise = sleep_until(rise)
+            output(pins, high)
+            self.rises.record(rise, actual_rise)
+            fall = actual_rise + width_ns
+            actual_fall = sleep_until(fall)
+            output(pins, low)
+            self.widths.record(fall, actual_fall)
+            if TRACER.enabled:
+                TRACER.record(PULSE, mask, actual_fall - actual_rise)
+            rise += period_ns
+        return self.report()
+
+    def run_pwm(self, pwm):
+        """
+        pwm: 见 hardware.open_pwm；启用后在最后一个脉冲之后的低电平中点停止
+        """
+        self.source = "pwm"
+        pwm.configure(self.period_ns, self.width_ns)
+        period_ns = pwm.period_ns
+        self.achieved_period_ns = period_ns
+        started = pwm.enable()
+        last = (self.count - 1) * period_ns
+        stop = started + last + (pwm.duty_ns + period_ns) // 2
+        # 等待期间可被 stop() 打断，最后一段按截止时刻对齐
+        remaining = stop - time.perf_counter_ns() - SPIN_NS
+        if not (remaining > 0 and self.stop_event.wait(remaining / 1e9)):
+            sleep_until(stop)
+        pwm.disable()
+        stopped = time.perf_counter_ns()
+        pulses = min(self.count, (stopped - started) // period_ns + 1)
+        for i in range(pulses):
+            rise = started + i * period_ns
+            self.rises.record(rise, rise)
+            self.widths.record(rise + self.width_ns, rise + pwm.duty_ns)
+        return self.report()
+
+    def report(self):
+        """
+        实际输出的脉冲数、频率与脉宽误差
+        """
+        pulses = min(self.rises.count, self.widths.count)
+        if self.achieved_period_ns is not None:
+            achieved_hz = 1e9 / self.achieved_period_ns
+        elif pulses > 1:
+            span = self.rises.actuals[pulses - 1] - self.rises.actuals[0]
+            achieved_hz = (pulses - 1) * 1e9 / span
+        else:
+            achieved_hz = 0.0
+        return {
+            "source": self.source,
+            "pulses": pulses,
+            "requested": self.count,
+            "frequency_hz": self.frequency,
+            "achieved_hz": round(achieved_hz, 4),
+            "width_s": self.width,
+            "rise_error": self.rises.stats(),
+            "width_error": self.widths.stats(),
+        }
+
+
+class PulseTrainRunner:
+    """
+    脉冲串的统一入口：在单个工作线程中按提交顺序输出，可随时中止
+    rotateController 与 pulse.py 都通过它发射，引脚与硬件 PWM 见 pulseConfig
+    output: 签名同 GPIO.output(pins, values)
+    """
+
+    def __init__(self, output, pins=REACTION_GENERATOR_PIN, pwm=PULSE_PWM):
+        self.output = output
+        self.pins = pins
+        self.pwm_config = pwm
+        self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="PulseTrain")
+        self.trains = []  # 排队及正在输出的脉冲串 (PulseTrain, Future)
+        self._pwm = None
+
+    def start(self, count, frequency, width=SHOOT_INTERVAL, hardware=False):
+        """
+        提交一串脉冲，返回 Future，结果见 PulseTrain.report
+        hardware 为 True 时由硬件 PWM 输出，否则按截止时刻输出 GPIO
+        """
+        train = PulseTrain(count, frequency, width)
+        if hardware:
+            if self._pwm is None:
+                self._pwm = open_pwm(*self.pwm_config)
+            future = self.worker.submit(train.run_pwm, self._pwm)
+        else:
+            future = self.worker.submit(train.run_gpio, self.output, self.pins)
+        self.trains = [item for item in self.trains if not item[1].done()]
+        self.trains.append((train, future))
+        return future
+
+    def busy(self):
+        return any(not future.done() for _, future in self.trains)
+
+    def abort(self):
+        """
+        中止排队及正在输出的脉冲串
+        """
+        for train, future in self.trains:
+            future.cancel()
+            train.stop()
+        self.trains = []
+
+    def close(self):
+        self.abort()
+        self.worker.shutdown(wait=True)
+        if self._pwm is not None:
+            self._pwm.close()
+            self._pwm = None
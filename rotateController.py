@@ -1,11 +1,43 @@
-import pygame
+import os
+import json
+import math
 import time
 import logging
-from PCA9685 import PCA9685
+import functools
+import signal
+import threading
+from collections import Counter, OrderedDict
+from boardManager import BoardManager
+from commandServer import DEFAULT_SOCKET, CommandServer
+from motion import AxisTrack, MotionProfile, StepperEngine, compile_sequence
+from motionWorker import MotionProcess
+from pulseConfig import REACTION_GENERATOR_PIN, SHOOT_INTERVAL
+from pulseTrain import PulseTrainRunner
+from scan import SCAN_SETTLE, RasterScan
+from timing import (
+    SPIN_NS,
+    LatencyHistogram,
+    LatencyProbe,
+    RateMeter,
+    TimingRecorder,
+    sleep_until,
+)
+from sequencer import Sequencer, Step
+from servo import ServoCalibration, ServoTimeline, plan_counts
+from trigger import PulseTrigger
+from tracer import GPIO_OUT, PULSE, TRACER, level_mask, pin_mask
 
 log_format = "%(levelname)s | %(asctime)-15s | %(message)s"
 logging.basicConfig(format=log_format, level=logging.DEBUG)
-import RPi.GPIO as GPIO
+from hardware import BACKEND, load_gpio
+
+GPIO = load_gpio()
+
+HEADLESS = os.environ.get("RIG_HEADLESS", "0") == "1"  # 无界面模式，不导入 pygame
+if not HEADLESS:
+    import pygame
+else:
+    pygame = None
 
 logger = logging.getLogger(name="GPIO")
 
@@ -14,6 +46,7 @@ logger = logging.getLogger(name="GPIO")
 todo: 需要根据实际情况设置
 """
 # 舵机参数
+SERVO_BOARDS = [(1, 0x40)]  # PCA9685 板子 (I2C 总线号, 地址)，全局通道号按此顺序每块 16 个
 SERVO_CHANNEL = 1
 SERVO_PWM_FREQ = 50
 SERVO_START_ANGLE = 34
@@ -23,27 +56,98 @@ SERVO_FINAL_RESOLUTION = 1  # 最后上升精度，最大值 1
 SERVO_GAP_DURATION = 0  # 舵机调整间隔，单位秒，最小值 0
 SERVO_RESET_GAP_DURATION = 0.5  # 舵机最后下降复位时的调整间隔，单位秒，最小值 0
 SERVO_FINAL_STAY_DURATION = 20  # 液滴停留时长，单位秒
+SERVO_TICK = 20 / 1000  # 按时长运动时的更新间隔，等于一个 PWM 周期
+# 各通道舵机标定（0 度与 180 度对应的脉宽，单位 us）
+SERVO_CALIBRATION = {
+    SERVO_CHANNEL: ServoCalibration(min_pulse_us=501, max_pulse_us=2501),
+}
+DEFAULT_SERVO_CALIBRATION = ServoCalibration()  # 未单独标定的通道
+# 各舵机通道（全局通道号）的初始角度，例如倾斜、快门舵机：{SERVO_CHANNEL: ..., 2: 90}
+SERVO_START_ANGLES = {SERVO_CHANNEL: SERVO_START_ANGLE}
+SERVO_MOVE_DURATION = 1.0  # servo_move 默认时长，单位秒
 
-SHOOT_INTERVAL = 10 / 1000  # 发射脉冲宽度 10 ms
+FAST_CAM_INTERVAL = 5 / 1000  # 高速摄影机触发脉冲宽度 5 ms
+FAST_CAM_LEAD = 0  # 同时触发时相机相对发射脉冲的提前量，单位秒
+# 触发方式：gpio 由 CPU 定时输出，pca9685 由 PCA9685 空闲通道的相位寄存器输出
+TRIGGER_MODE = os.environ.get("RIG_TRIGGER", "gpio")
+# 输出触发脉冲的板子：触发时振荡器会休眠重启，该板其他通道少一个 PWM 周期并改变相位，
+# 因此默认使用独立的板子，不能与 SERVO_BOARDS 共用
+TRIGGER_BOARD = (1, 0x41)
+# 确认舵机可以承受每次触发丢失一个周期时，才允许与舵机共用一块板子
+TRIGGER_SHARED_BOARD = os.environ.get("RIG_TRIGGER_SHARED", "0") == "1"
+TRIGGER_CHANNELS = {"shot": 14, "camera": 15}  # 板内通道号
 INTERVAL = 10 / 1000  # 电机脉冲间隔 10 ms
 ROTATE_CYCLE_LR_UD = 100  # 位移台，移动单位距离需要的脉冲循环次数,10000-1.2mm
 ROTATE_CYCLE_TF = 10  # 变压器，移动单位距离需要的脉冲循环次数
+STEPS_PER_UNIT_LR_UD = ROTATE_CYCLE_LR_UD + 1  # 每次按键实际输出的拍数（原循环条件为 <=）
+# 每次按键各轴移动的半步数
+AXIS_KEY_STEPS = {
+    "LR": STEPS_PER_UNIT_LR_UD,
+    "UD": STEPS_PER_UNIT_LR_UD,
+    "TF": ROTATE_CYCLE_TF + 1,
+}
+# 各轴加减速参数：起步速度、最高速度（拍/秒）、加速度（拍/秒²），todo: 需要根据实际情况设置
+AXIS_PROFILES = {
+    "LR": MotionProfile(start_speed=1 / INTERVAL, max_speed=300, acceleration=600),
+    "UD": MotionProfile(start_speed=1 / INTERVAL, max_speed=300, acceleration=600),
+    "TF": MotionProfile(
+        start_speed=1 / INTERVAL, max_speed=1 / INTERVAL, acceleration=0
+    ),
+}
 UNIT = 0.1  # 坐标系单位长度
 UNIT_SUFFIX = "mm"  # 坐标系长度单位
 
-# 引脚定义：A、B、C、D
-# ROTATE_PINS_LR =  [4, 17, 21, 22]# 左右方向键控制
-# ROTATE_PINS_UD = [12, 16, 20, 21]  # 上下方向键控制
-
 """
-GPIO 信号
+GPIO 信号（BCM 编号），GPIO2/3 为 I2C，GPIO18 为脉冲串硬件 PWM，均不可占用
 """
+# 步进电机引脚定义：A、B、C、D
+ROTATE_PINS_LR = [17, 22, 23, 24]  # 左右方向键控制
+ROTATE_PINS_UD = [25, 12, 7, 8]  # 上下方向键控制
 ROTATE_PINS_TF = [6, 13, 19, 26]  # 变压器控制, d、s 键控制，放大为顺时针，缩小为逆时针
-REACTION_GENERATOR_PIN = [5]  # 发生器脉冲控制
+MOTOR_PINS = ROTATE_PINS_LR + ROTATE_PINS_UD + ROTATE_PINS_TF
 RELAY_PINS = [4]  # 继电器控制
 LED_PIN = [16]  # LED 控制
 FAST_CAM_PIN = [20]  # 高速摄影机控制
 THERMOSTAT_PIN = [21]  # 温控器控制
+RESERVED_PINS = [2, 3, 18]  # I2C、硬件 PWM
+OUTPUT_PINS = (
+    MOTOR_PINS
+    + REACTION_GENERATOR_PIN
+    + LED_PIN
+    + THERMOSTAT_PIN
+    + RELAY_PINS
+    + FAST_CAM_PIN
+)  # 全部输出引脚
+
+# 步进电机在独立的实时进程中运行（motionWorker），电机引脚由该进程申请和驱动
+MOTION_PROCESS = os.environ.get("RIG_MOTION_PROCESS", "0") == "1"
+MOTION_CPU = os.environ.get("RIG_MOTION_CPU")  # 绑定的 CPU 核心，建议用 isolcpus 隔离
+MOTION_FIFO_PRIORITY = int(os.environ.get("RIG_MOTION_FIFO", 0))  # 0 不使用 SCHED_FIFO
+MOTION_LOCK_MEMORY = os.environ.get("RIG_MOTION_MLOCK", "0") == "1"
+# 本进程直接驱动的引脚
+CONTROLLER_PINS = [
+    pin for pin in OUTPUT_PINS if not (MOTION_PROCESS and pin in MOTOR_PINS)
+]
+
+
+def check_pin_config():
+    """
+    启动时检查引脚表：每个电机四个引脚，引脚不重复，不占用 I2C 与硬件 PWM
+    """
+    for name, pins in (
+        ("ROTATE_PINS_LR", ROTATE_PINS_LR),
+        ("ROTATE_PINS_UD", ROTATE_PINS_UD),
+        ("ROTATE_PINS_TF", ROTATE_PINS_TF),
+    ):
+        if len(pins) != 4:
+            raise RuntimeError("Pin config %s needs 4 pins, got %s" % (name, pins))
+    duplicated = sorted(pin for pin, n in Counter(OUTPUT_PINS).items() if n > 1)
+    if duplicated:
+        raise RuntimeError("Pin config error, pins used twice: %s" % duplicated)
+    reserved = sorted(set(OUTPUT_PINS) & set(RESERVED_PINS))
+    if reserved:
+        raise RuntimeError("Pin config error, reserved pins used: %s" % reserved)
+
 
 """
 顺时针转动矩阵（八拍）
@@ -75,32 +179,173 @@ SEQ_ANTICLOCKWISE = [
     [1, 0, 0, 0],
 ]
 
+# 双相整步（四拍）
+SEQ_FULL_CLOCKWISE = [
+    [1, 1, 0, 0],
+    [0, 1, 1, 0],
+    [0, 0, 1, 1],
+    [1, 0, 0, 1],
+]
+
+# 单相波形驱动（四拍）
+SEQ_WAVE_CLOCKWISE = [
+    [1, 0, 0, 0],
+    [0, 1, 0, 0],
+    [0, 0, 1, 0],
+    [0, 0, 0, 1],
+]
+
 SEQ_LEN = 8
+STEP_MODE = "half"  # 驱动方式：half 八拍，full 双相四拍，wave 单相四拍
+# 驱动方式 -> (每拍对应的半步数, {方向: 序列表})，导入时编译一次
+STEP_TABLES = {
+    "half": (
+        1,
+        {
+            1: compile_sequence(SEQ_CLOCKWISE),
+            -1: compile_sequence(SEQ_ANTICLOCKWISE),
+        },
+    ),
+    "full": (
+        2,
+        {
+            1: compile_sequence(SEQ_FULL_CLOCKWISE),
+            -1: compile_sequence(SEQ_FULL_CLOCKWISE[::-1]),
+        },
+    ),
+    "wave": (
+        2,
+        {
+            1: compile_sequence(SEQ_WAVE_CLOCKWISE),
+            -1: compile_sequence(SEQ_WAVE_CLOCKWISE[::-1]),
+        },
+    ),
+}
 WIHTE_COLOR = (255, 255, 255)
 BG_COLOR = (61, 162, 113)
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 800
 SCREEN_TITLE = "电机控制"
+TRACE_FILE_PREFIX = os.environ.get("RIG_TRACE_FILE", "rig_trace")  # 追踪导出文件名前缀
+FRAME_RATE = 30  # 画面刷新帧率上限
+IDLE_WAIT_MS = 500  # 空闲时等待事件的超时，单位毫秒
+FONT_CACHE_SIZE = 16  # 缓存的字体对象个数
+TEXT_CACHE_SIZE = 256  # 缓存的文字渲染结果个数
+OVERLAY = os.environ.get("RIG_OVERLAY", "0") == "1"  # 启动时显示性能浮层，p 键切换
+OVERLAY_REFRESH = 0.5  # 浮层刷新间隔，单位秒
+OVERLAY_POS = (10, 10)
+OVERLAY_FONT_SIZE = 18
+OVERLAY_COLOR = (30, 30, 30)
+# 统计耗时的动作
+PERF_ACTIONS = ("rotate", "move_to", "servo_rotate", "servo_move", "shoot", "redraw")
+
+# 按键 -> (轴, 方向)，约定：左上为逆时针，右下为顺时针
+KEY_AXIS = (
+    {
+        pygame.K_LEFT: ("LR", -1),
+        pygame.K_RIGHT: ("LR", 1),
+        pygame.K_UP: ("UD", -1),
+        pygame.K_DOWN: ("UD", 1),
+        pygame.K_d: ("TF", -1),
+        pygame.K_s: ("TF", 1),
+    }
+    if pygame is not None
+    else {}
+)
+
+PIN_FUNCTION_NAMES = {
+    GPIO.IN: "Input",
+    GPIO.OUT: "Output",
+    GPIO.I2C: "I2C",
+    GPIO.SPI: "SPI",
+    GPIO.HARD_PWM: "HARD_PWM",
+    GPIO.SERIAL: "Serial",
+    GPIO.UNKNOWN: "Unknown",
+}
+# 引脚自检结果缓存：引脚表与开机 ID 不变时只做快速检查
+PIN_TEST_CACHE = os.path.expanduser("~/.cache/rotate_controller_pins.json")
+BOOT_ID_FILE = "/proc/sys/kernel/random/boot_id"
+
+
+def format_us(us):
+    """
+    耗时显示：us / ms / s
+    """
+    if us < 1000:
+        return "%.0fus" % us
+    if us < 1_000_000:
+        return "%.1fms" % (us / 1000)
+    return "%.2fs" % (us / 1_000_000)
+
+
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(font_size, font_bold, font_italic, underline):
+    """
+    按样式缓存字体对象，避免每次重新加载默认字体
+    """
+    cur_font = pygame.font.Font(None, font_size)
+    cur_font.set_underline(underline)
+    cur_font.set_bold(font_bold)
+    cur_font.set_italic(font_italic)
+    return cur_font
 
 
 class RotateController:
-    def __init__(self, width, height, title, bg_color=BG_COLOR):
+    def __init__(self, width, height, title, bg_color=BG_COLOR, headless=HEADLESS):
         """
-        初始化窗口
+        初始化窗口，headless 时不创建窗口，只控制硬件
         """
-        pygame.init()
-        pygame.display.set_caption(title)
-        self.screen = pygame.display.set_mode((width, height))
+        self.headless = headless
         self.width = width
         self.height = height
         self.bg_color = bg_color
-        self.reset_screen()
-        self.point_rect = pygame.draw.circle(
-            self.screen, WIHTE_COLOR, (int(self.width / 2), int(self.height / 2)), 3
-        )
+        self.background = None  # 坐标系等静态背景，首次绘制时生成
+        self.dirty_rects = []  # 待刷新到屏幕的区域
+        self.text_cache = OrderedDict()  # 文字渲染结果，按最近使用淘汰
+        self.marker_rects = []  # 当前标记点、辅助线、坐标文字占用的区域
+        # 性能统计：各动作耗时直方图、帧率、每轮取出的事件数
+        self.perf = {name: LatencyHistogram() for name in PERF_ACTIONS}
+        self.frame_rate = RateMeter()
+        self.events_per_loop = 0
+        self.events_per_loop_max = 0
+        self.overlay = OVERLAY and not headless
+        self.overlay_rect = None
+        self.overlay_next = 0
+        if not self.headless:
+            pygame.init()
+            pygame.display.set_caption(title)
+            self.screen = pygame.display.set_mode((width, height))
+            self.reset_screen()
+            self.point_rect = pygame.draw.circle(
+                self.screen,
+                WIHTE_COLOR,
+                (int(self.width / 2), int(self.height / 2)),
+                3,
+            )
+            self.marker_rects = [self.point_rect]
         self.point = (0, 0)
+        self._axis_pins = {}
         self.init_pins()
+        self.input_latency = LatencyProbe()  # 按键到第一次 GPIO/I2C 输出的延迟
+        if MOTION_PROCESS:
+            self.stepper = MotionProcess(
+                cpu=int(MOTION_CPU) if MOTION_CPU is not None else None,
+                fifo_priority=MOTION_FIFO_PRIORITY,
+                lock_memory=MOTION_LOCK_MEMORY,
+            )
+        else:
+            self.stepper = StepperEngine(output=self.gpio_output)
+        self.pulse_timing = TimingRecorder()  # 脉冲下降沿的目标时刻与实际时刻
+        # 同一时刻只有一个舵机运动在写入；置位 servo_stop 后正在进行的运动在下一拍前退出
+        self.servo_lock = threading.Lock()
+        self.servo_stop = threading.Event()
         self.init_servo()
+        self.sequencer = Sequencer()
+        self.reaction = None  # 正在进行的反应流程（Future）
+        self.reaction_stop = threading.Event()  # 中止时置位，打断流程中的舵机运动
+        self.halted = False  # 急停后置位，中止流程时不再驱动舵机
+        self.scanner = None  # 正在进行的光栅扫描
+        self.pulse_trains = PulseTrainRunner(self.gpio_output)
         # 0. 温控器开始工作
         self.thermostat_control(action="start")
 
@@ -108,29 +353,61 @@ class RotateController:
         """
         初始化引脚电平状态
         """
+        check_pin_config()
         GPIO.setmode(GPIO.BCM)
         GPIO.setwarnings(False)
-        for pin in (
-            ROTATE_PINS_TF
-            + REACTION_GENERATOR_PIN
-            + LED_PIN
-            + THERMOSTAT_PIN
-            + RELAY_PINS
-            + FAST_CAM_PIN
-        ):
-            logger.info("Setup pin_%s" % pin)
-            GPIO.setup(pin, GPIO.OUT, initial=GPIO.LOW)
-            # 初始化 pin 检测结果
-            self.detect_pin(pin=pin, mode=GPIO.OUT)
+        test_key = self.pin_test_key()
+        full_test = self.load_pin_test_key() != test_key
+        # 一次配置全部输出引脚，字符设备后端据此一次请求所有线路
+        logger.debug("Setup pins %s", CONTROLLER_PINS)
+        GPIO.setup(CONTROLLER_PINS, GPIO.OUT, initial=GPIO.LOW)
+        for pin in CONTROLLER_PINS:
+            if full_test:
+                # 初始化 pin 检测结果
+                self.detect_pin(pin=pin, mode=GPIO.OUT)
+            elif GPIO.gpio_function(pin) != GPIO.OUT:
+                raise RuntimeError("Pin[%s] mode is wrong, init failed !!!" % pin)
+        if full_test:
+            self.save_pin_test_key(test_key)
+        else:
+            logger.info("Pin self-test cached, quick check passed")
+
+    def pin_test_key(self):
+        """
+        自检缓存的键：开机 ID + 后端 + 引脚表，任一变化都需要完整自检
+        """
+        try:
+            with open(BOOT_ID_FILE) as f:
+                boot_id = f.read().strip()
+        except OSError:
+            boot_id = None
+        return {"boot_id": boot_id, "backend": BACKEND, "pins": CONTROLLER_PINS}
+
+    def load_pin_test_key(self):
+        try:
+            with open(PIN_TEST_CACHE) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_pin_test_key(self, test_key):
+        if test_key["boot_id"] is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(PIN_TEST_CACHE), exist_ok=True)
+            with open(PIN_TEST_CACHE, "w") as f:
+                json.dump(test_key, f)
+        except OSError as e:
+            logger.warning("Save pin self-test cache failed: %s", e)
 
     def detect_pin(self, pin, mode):
         """
         检测 pin 能否正常输出
         """
-        logger.info("Detecting pin_%s" % pin)
+        logger.debug("Detecting pin_%s", pin)
         func = self.get_pin_function_name(pin=pin)
         if mode != func:
-            raise ("Pin[%s] mode is wrong, init failed !!!" % pin)
+            raise RuntimeError("Pin[%s] mode is wrong, init failed !!!" % pin)
         if mode == GPIO.OUT:
             GPIO.output(pin, GPIO.HIGH)
             assert GPIO.input(pin) == GPIO.HIGH, (
@@ -141,35 +418,112 @@ class RotateController:
                 "❌ Pin[%s] value check failed !!!, can not set  GPIO.LOW " % pin
             )
 
-        logger.info("✅ Pin[%s] is fine :)" % pin)
+        logger.info("✅ Pin[%s] is fine :)", pin)
 
     def get_pin_function_name(self, pin):
         """
         获取引脚的模式
         """
-        functions = {
-            GPIO.IN: "Input",
-            GPIO.OUT: "Output",
-            GPIO.I2C: "I2C",
-            GPIO.SPI: "SPI",
-            GPIO.HARD_PWM: "HARD_PWM",
-            GPIO.SERIAL: "Serial",
-            GPIO.UNKNOWN: "Unknown",
-        }
-        logger.info("Pin_%s is %s mode" % (pin, functions[GPIO.gpio_function(pin)]))
-        return GPIO.gpio_function(pin)
+        func = GPIO.gpio_function(pin)
+        logger.debug("Pin_%s is %s mode", pin, PIN_FUNCTION_NAMES.get(func))
+        return func
 
     def init_servo(self):
         """
         初始化舵机
         """
         logger.info("Setup Servo")
-        self.servo = PCA9685()
-        self.servo.setPWMFreq(SERVO_PWM_FREQ)
-        self.servo.setRotationAngle(SERVO_CHANNEL, SERVO_START_ANGLE)
-        self.servo_current_angle = SERVO_START_ANGLE
+        self.boards = BoardManager()
+        boards = list(SERVO_BOARDS)
+        if TRIGGER_MODE == "pca9685":
+            if TRIGGER_BOARD not in SERVO_BOARDS:
+                boards.append(TRIGGER_BOARD)
+            elif not TRIGGER_SHARED_BOARD:
+                raise RuntimeError(
+                    "Trigger board %s also drives servos, every shot would restart "
+                    "its oscillator; use a separate board or set "
+                    "RIG_TRIGGER_SHARED=1" % (TRIGGER_BOARD,)
+                )
+        for bus_id, address in boards:
+            self.boards.add_board(bus_id=bus_id, address=address)
+        for board in self.boards.boards:
+            board.on_write = self.input_latency.hit
+        self.servo = self.boards.boards[0]
+        self.boards.setPWMFreq(SERVO_PWM_FREQ)
+        self.trigger = None
+        if TRIGGER_MODE == "pca9685":
+            self.trigger = PulseTrigger(
+                self.boards.board(*TRIGGER_BOARD), TRIGGER_CHANNELS
+            )
+        # 所有通道先进入已知状态，之后的批量写入可以跨过未使用的通道
+        self.boards.allOff()
+        self.boards.setPWMBatch(
+            {
+                channel: (0, self.servo_calibration(channel).count(angle))
+                for channel, angle in SERVO_START_ANGLES.items()
+            }
+        )
+        self.servo_angles = dict(SERVO_START_ANGLES)  # 各通道当前角度
         logger.info("Setup Servo Finish")
 
+    @property
+    def servo_current_angle(self):
+        return self.servo_angles[SERVO_CHANNEL]
+
+    @servo_current_angle.setter
+    def servo_current_angle(self, angle):
+        self.servo_angles[SERVO_CHANNEL] = angle
+
+    def servo_calibration(self, channel=SERVO_CHANNEL):
+        """
+        通道（全局通道号）的标定，未单独标定时使用 DEFAULT_SERVO_CALIBRATION
+        """
+        return SERVO_CALIBRATION.get(channel, DEFAULT_SERVO_CALIBRATION)
+
+    def servo_move(self, targets, duration=SERVO_MOVE_DURATION, easing="linear"):
+        """
+        多个舵机通道同步运动：targets {全局通道号: 目标角度}，在 duration 秒内同时到达
+        每 SERVO_TICK 一个节拍，所有通道的新计数合并为一次批量写入
+        """
+        started = time.perf_counter_ns()
+        targets = {int(channel): angle for channel, angle in targets.items()}
+        starts = {
+            channel: self.servo_angles.get(channel, angle)
+            for channel, angle in targets.items()
+        }
+        timeline = ServoTimeline(
+            {channel: self.servo_calibration(channel) for channel in targets},
+            starts,
+            targets,
+            round(duration / SERVO_TICK),
+            easing,
+        )
+        tick_ns = int(duration * 1e9) // timeline.steps
+        with self.servo_lock:
+            deadline = time.perf_counter_ns()
+            for frame in timeline.frames:
+                if self.servo_stop.is_set():
+                    # 中断后实际角度未知，保留原记录
+                    logger.warning("servo_move interrupted")
+                    return dict(self.servo_angles)
+                if frame:
+                    self.boards.setPWMBatch(frame)
+                deadline += tick_ns
+                self.servo_wait(deadline, self.servo_stop)
+        self.servo_angles.update(targets)
+        self.perf["servo_move"].record(time.perf_counter_ns() - started)
+        return dict(self.servo_angles)
+
+    def servo_wait(self, deadline, stop):
+        """
+        等待到 deadline（纳秒），期间可被 stop 打断，返回是否被打断
+        """
+        remaining = deadline - time.perf_counter_ns() - SPIN_NS
+        if remaining > 0 and stop.wait(remaining / 1e9):
+            return True
+        sleep_until(deadline)
+        return stop.is_set()
+
     def servo_rotate(
         self,
         resolution,
@@ -177,42 +531,100 @@ class RotateController:
         end_angle,
         gap_duration,
         record_angle=False,
+        duration=None,
+        easing="linear",
+        stop=None,
     ):
         """
-        舵机调整
+        舵机调整，运动前按标定表生成完整的 PCA9685 计数序列
         Args:
-            resolution (int or float): 精度
+            resolution (int or float): 精度，每步角度变化，可小于 1 度
             start_angle (int or float, optional): 起始角度. Defaults to None.
             end_angle (int or float, optional): 结束角度. Defaults to None.
             gap_duration (int): 控制角度变化间隔.
             record_angle (bool, optional): 是否记录角度. Defaults to False.
+            duration (float, optional): 运动总时长，给定时按 SERVO_TICK 推算步数，
+                忽略 resolution 与 gap_duration. Defaults to None.
+            easing (str, optional): 缓动方式 linear / ease_in_out. Defaults to linear.
+            stop (threading.Event, optional): 置位后在下一拍前退出.
+                Defaults to servo_stop.
+        Returns:
+            bool: 是否完整执行；角度越界或被打断时为 False
         """
-        direction = 1 if end_angle > start_angle else -1
+        calibration = self.servo_calibration(SERVO_CHANNEL)
+        if not (calibration.contains(start_angle) and calibration.contains(end_angle)):
+            # 微调越界时只提示，不中断主循环
+            logger.warning("Angle out of range: %s -> %s", start_angle, end_angle)
+            return False
+        if duration is not None:
+            steps = max(1, round(duration / SERVO_TICK))
+            gap_duration = duration / steps
+        else:
+            steps = math.ceil(abs(end_angle - start_angle) / resolution)
+        counts = plan_counts(calibration, start_angle, end_angle, steps, easing)
         logger.debug(
-            "servo_rotate[direction:%s][resolution:%s][start:%s][end:%s][record_angle:%s]"
-            % (direction, resolution, start_angle, end_angle, record_angle)
+            "servo_rotate[steps:%s][resolution:%s][start:%s][end:%s][record_angle:%s]",
+            steps,
+            resolution,
+            start_angle,
+            end_angle,
+            record_angle,
         )
-        for i in range(int(start_angle), int(end_angle) + direction, direction):
-            self.servo.setRotationAngle(SERVO_CHANNEL, i)
-            if record_angle and end_angle >= 1:
-                self.servo_current_angle = i
-            # 这里控制角度变化间隔
-            time.sleep(gap_duration)
-        return
+        stop = stop or self.servo_stop
+        gap_ns = int(gap_duration * 1e9)
+        with self.servo_lock:
+            deadline = started = time.perf_counter_ns()
+            for count in counts:
+                if stop.is_set():
+                    logger.warning("servo_rotate interrupted")
+                    return False
+                self.boards.setPWM(SERVO_CHANNEL, 0, count)
+                # 这里控制角度变化间隔
+                deadline += gap_ns
+                self.servo_wait(deadline, stop)
+        if record_angle and end_angle >= 1:
+            self.servo_current_angle = end_angle
+        self.perf["servo_rotate"].record(time.perf_counter_ns() - started)
+        return True
 
-    def reset_screen(self):
+    def render_background(self):
         """
-        重置画面
+        预先绘制静态背景：坐标系、刻度、文字
         """
-        self.screen.fill(self.bg_color)
-        self.draw_coordinate_system()
+        self.background = pygame.Surface((self.width, self.height)).convert()
+        self.background.fill(self.bg_color)
+        self.draw_coordinate_system(surface=self.background)
         self.draw_text(
             text="By Locker",
             pos=(self.width - 60, self.height - 20),
             color=WIHTE_COLOR,
             underline=True,
+            surface=self.background,
         )
 
+    def reset_screen(self):
+        """
+        重置画面
+        """
+        if self.background is None:
+            self.render_background()
+        self.screen.blit(self.background, (0, 0))
+        self.dirty_rects = [self.screen.get_rect()]
+
+    def redraw_all(self):
+        """
+        整屏刷新：屏幕内容仍在，只是窗口被遮挡后需要重新提交到显示
+        """
+        self.dirty_rects = [self.screen.get_rect()]
+
+    def update_display(self):
+        """
+        只刷新发生变化的区域
+        """
+        if self.dirty_rects:
+            pygame.display.update(self.dirty_rects)
+            self.dirty_rects = []
+
     def draw_text(
         self,
         pos,
@@ -222,10 +634,11 @@ class RotateController:
         font_size=15,
         font_italic=False,
         underline=False,
+        surface=None,
     ):
         """
-        文字显示
-        surface_handle：surface句柄
+        文字显示，返回文字占用的区域
+        surface：surface句柄，默认为屏幕
         pos：文字显示位置
         color:文字颜色
         font_bold:是否加粗
@@ -233,29 +646,38 @@ class RotateController:
         font_italic:是否斜体
         underline: 是否下划线
         """
-        cur_font = pygame.font.Font(None, font_size)
-        cur_font.set_underline(underline)
-        cur_font.set_bold(font_bold)
-        cur_font.set_italic(font_italic)
-        text_fmt = cur_font.render(text, True, color)
-        self.screen.blit(text_fmt, pos)
+        key = (text, tuple(color), font_size, font_bold, font_italic, underline)
+        text_fmt = self.text_cache.get(key)
+        if text_fmt is None:
+            cur_font = get_font(font_size, font_bold, font_italic, underline)
+            text_fmt = cur_font.render(text, True, color)
+            self.text_cache[key] = text_fmt
+            if len(self.text_cache) > TEXT_CACHE_SIZE:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        if surface is None:
+            surface = self.screen
+        return surface.blit(text_fmt, pos)
 
-    def draw_coordinate_system(self):
+    def draw_coordinate_system(self, surface=None):
         """
         画坐标系
         """
+        if surface is None:
+            surface = self.screen
         color = 0, 0, 0
         width = 1
         # 画坐标系 Surface, color, start_pos, end_pos, width=1
         pygame.draw.line(
-            self.screen,
+            surface,
             color,
             (10, self.height / 2),
             (self.width - 10, self.height / 2),
             width,
         )
         pygame.draw.polygon(
-            self.screen,
+            surface,
             color,
             [
                 (self.width - 4, self.height / 2),
@@ -264,14 +686,14 @@ class RotateController:
             ],
         )
         pygame.draw.line(
-            self.screen,
+            surface,
             color,
             (self.width / 2, 10),
             (self.width / 2, self.height - 10),
             width,
         )
         pygame.draw.polygon(
-            self.screen,
+            surface,
             color,
             [
                 (self.width / 2, 4),
@@ -299,7 +721,7 @@ class RotateController:
             offset = 8 if index % 5 == 0 else 4
             x_item = x_list_pos[index]
             pygame.draw.line(
-                self.screen,
+                surface,
                 color,
                 (x_item, self.height / 2 - offset),
                 (x_item, self.height / 2),
@@ -307,7 +729,10 @@ class RotateController:
             )
             if index % 5 == 0 and index > 0:
                 self.draw_text(
-                    text=str(num), pos=(x_item - 5, self.height / 2 + 8), font_size=20
+                    surface=surface,
+                    text=str(num),
+                    pos=(x_item - 5, self.height / 2 + 8),
+                    font_size=20,
                 )
                 num += UNIT * 5
         num = -UNIT * 5
@@ -315,7 +740,7 @@ class RotateController:
             offset = 8 if index % 5 == 0 else 4
             x_item = x_list_neg[index]
             pygame.draw.line(
-                self.screen,
+                surface,
                 color,
                 (x_item, self.height / 2 - offset),
                 (x_item, self.height / 2),
@@ -323,7 +748,10 @@ class RotateController:
             )
             if index % 5 == 0 and index > 0:
                 self.draw_text(
-                    text=str(num), pos=(x_item - 10, self.height / 2 + 8), font_size=20
+                    surface=surface,
+                    text=str(num),
+                    pos=(x_item - 10, self.height / 2 + 8),
+                    font_size=20,
                 )
                 num -= UNIT * 5
         num = UNIT * 5
@@ -331,7 +759,7 @@ class RotateController:
             offset = 8 if index % 5 == 0 else 4
             y_item = y_list_pos[index]
             pygame.draw.line(
-                self.screen,
+                surface,
                 color,
                 (self.width / 2, y_item),
                 (self.width / 2 + offset, y_item),
@@ -339,7 +767,10 @@ class RotateController:
             )
             if index % 5 == 0 and index > 0:
                 self.draw_text(
-                    text=str(num), pos=(self.width / 2 - 25, y_item - 2), font_size=20
+                    surface=surface,
+                    text=str(num),
+                    pos=(self.width / 2 - 25, y_item - 2),
+                    font_size=20,
                 )
                 num += UNIT * 5
         num = -UNIT * 5
@@ -347,7 +778,7 @@ class RotateController:
             offset = 8 if index % 5 == 0 else 4
             y_item = y_list_neg[index]
             pygame.draw.line(
-                self.screen,
+                surface,
                 color,
                 (self.width / 2, y_item),
                 (self.width / 2 + offset, y_item),
@@ -355,115 +786,357 @@ class RotateController:
             )
             if index % 5 == 0 and index > 0:
                 self.draw_text(
-                    text=str(num), pos=(self.width / 2 - 27, y_item - 4), font_size=20
+                    surface=surface,
+                    text=str(num),
+                    pos=(self.width / 2 - 27, y_item - 4),
+                    font_size=20,
                 )
                 num -= UNIT * 5
 
-    def move_point(self, key):
-        """
-        移动标记点
-        """
-        if key == pygame.K_LEFT:
-            x, y = (-10, 0)
-            self.point = (round(self.point[0] - UNIT, 1), self.point[1])
-        elif key == pygame.K_RIGHT:
-            x, y = (10, 0)
-            self.point = (round(self.point[0] + UNIT, 1), self.point[1])
-        elif key == pygame.K_UP:
-            x, y = (0, -10)
-            self.point = (self.point[0], round(self.point[1] + UNIT, 1))
-        elif key == pygame.K_DOWN:
-            x, y = (0, 10)
-            self.point = (self.point[0], round(self.point[1] - UNIT, 1))
-        else:
-            return
-        self.reset_screen()
-        new_x = self.point_rect.centerx + x
-        new_y = self.point_rect.centery + y
+    def current_point(self):
+        """
+        根据步进电机实际位置换算坐标
+        """
+        x = self.stepper.get_position("LR") / STEPS_PER_UNIT_LR_UD * UNIT
+        y = -self.stepper.get_position("UD") / STEPS_PER_UNIT_LR_UD * UNIT
+        return (round(x, 2), round(y, 2))
+
+    def move_point(self, key=None):
+        """
+        移动标记点到位移台实际位置，位置未变化时不重绘
+        """
+        point = self.current_point()
+        if point == self.point:
+            return False
+        self.point = point
+        if self.headless:
+            return True
+        # 用背景覆盖上一次的标记点、辅助线和坐标文字
+        for rect in self.marker_rects:
+            self.screen.blit(self.background, rect, rect)
+        new_x = int(self.width / 2 + self.point[0] / UNIT * 10)
+        new_y = int(self.height / 2 - self.point[1] / UNIT * 10)
         text_x = new_x if new_x >= self.width / 2 else new_x - 30
         text_y = new_y if new_y >= self.height / 2 else new_y - 20
         self.point_rect = pygame.draw.circle(
             self.screen, WIHTE_COLOR, (new_x, new_y), 3
         )
-        pygame.draw.line(
-            self.screen,
-            WIHTE_COLOR,
-            (new_x, self.height / 2),
-            (new_x, new_y),
-            1,
+        rects = [self.point_rect]
+        rects.append(
+            pygame.draw.line(
+                self.screen,
+                WIHTE_COLOR,
+                (new_x, self.height / 2),
+                (new_x, new_y),
+                1,
+            )
         )
-        pygame.draw.line(
-            self.screen,
-            WIHTE_COLOR,
-            (self.width / 2, new_y),
-            (new_x, new_y),
-            1,
+        rects.append(
+            pygame.draw.line(
+                self.screen,
+                WIHTE_COLOR,
+                (self.width / 2, new_y),
+                (new_x, new_y),
+                1,
+            )
         )
-        self.draw_text(
-            text=f"({self.point[0]}{UNIT_SUFFIX}, {self.point[1]}{UNIT_SUFFIX})",
-            pos=(text_x, text_y),
-            font_size=20,
-            color=WIHTE_COLOR,
+        rects.append(
+            self.draw_text(
+                text=f"({self.point[0]}{UNIT_SUFFIX}, {self.point[1]}{UNIT_SUFFIX})",
+                pos=(text_x, text_y),
+                font_size=20,
+                color=WIHTE_COLOR,
+            )
         )
+        self.dirty_rects += self.marker_rects + rects
+        self.marker_rects = rects
+        return True
 
     def rotate(self, key):
         """
-        电机旋转控制
+        电机旋转控制：运动加入后台队列后立即返回 Future，结果为实际执行的拍数
         """
-        if key in [pygame.K_LEFT, pygame.K_UP, pygame.K_d]:
-            seq = SEQ_ANTICLOCKWISE
-        else:
-            seq = SEQ_CLOCKWISE
-
-        if key in [pygame.K_LEFT, pygame.K_RIGHT]:
-            rotate_pins = ROTATE_PINS_LR
-            rotate_cycle = ROTATE_CYCLE_LR_UD
-        elif key in [pygame.K_UP, pygame.K_DOWN]:
-            rotate_pins = ROTATE_PINS_UD
-            rotate_cycle = ROTATE_CYCLE_LR_UD
-        else:
-            rotate_pins = ROTATE_PINS_TF
-            rotate_cycle = ROTATE_CYCLE_TF
+        axis, direction = KEY_AXIS.get(key, ("TF", 1))
+        return self.rotate_axis(axis, direction)
 
-        cycle_couter = 0
-        step_couter = 0
-        while cycle_couter <= rotate_cycle:
-            GPIO.output(rotate_pins, tuple(seq[step_couter]))
+    def rotate_axis(self, axis, direction):
+        """
+        指定轴按一次按键的距离转动，direction 1 顺时针，-1 逆时针
+        """
+        step_size, tables = STEP_TABLES[STEP_MODE]
+        future = self.stepper.submit(
+            axis=axis,
+            pins=self.axis_pins(axis),
+            seq=tables[direction],
+            steps=-(-AXIS_KEY_STEPS[axis] // step_size),
+            direction=direction,
+            profile=AXIS_PROFILES[axis],
+            step_size=step_size,
+        )
+        return self.track("rotate", future)
 
-            cycle_couter += 1
-            step_couter += 1
+    def track(self, action, future):
+        """
+        记录运动从提交到完成的耗时（含排队），被取消的不计
+        """
+        started = time.perf_counter_ns()
+        histogram = self.perf[action]
+
+        def done(f):
+            if not f.cancelled():
+                histogram.record(time.perf_counter_ns() - started)
 
-            step_couter = 0 if step_couter >= SEQ_LEN else step_couter
-            time.sleep(INTERVAL)
+        future.add_done_callback(done)
+        return future
 
-    def shoot_pulse(self):
+    def axis_pins(self, axis):
         """
-        脉冲发射
+        各轴引脚 tuple，首次使用时解析并缓存
         """
-        for pin in REACTION_GENERATOR_PIN:
-            GPIO.output(pin, GPIO.HIGH)
-            time.sleep(SHOOT_INTERVAL)  # the high level will last 0.01s(10ms)
-            GPIO.output(pin, GPIO.LOW)
+        pins = self._axis_pins.get(axis)
+        if pins is None:
+            if axis == "LR":
+                pins = ROTATE_PINS_LR
+            elif axis == "UD":
+                pins = ROTATE_PINS_UD
+            else:
+                pins = ROTATE_PINS_TF
+            pins = self._axis_pins[axis] = tuple(pins)
+        return pins
+
+    def gpio_output(self, pins, values):
+        """
+        GPIO 输出，同时记录按键到第一次输出的延迟
+        """
+        GPIO.output(pins, values)
+        self.input_latency.hit()
+        if TRACER.enabled:
+            TRACER.record(GPIO_OUT, pin_mask(pins), level_mask(pins, values))
+
+    def send_pulse(self, pins, width):
+        """
+        输出定宽脉冲，所有引脚同时翻转，下降沿按绝对时刻对齐，宽度误差记录在 pulse_timing
+        """
+        width_ns = int(width * 1e9)
+        self.gpio_output(pins, GPIO.HIGH)
+        deadline = time.perf_counter_ns() + width_ns
+        actual = sleep_until(deadline)
+        self.gpio_output(pins, GPIO.LOW)
+        self.pulse_timing.record(deadline, actual)
+        if TRACER.enabled:
+            TRACER.record(PULSE, pin_mask(pins), actual - deadline + width_ns)
+
+    def move_to(self, x, y):
+        """
+        位移台左右、上下两轴联动移动到坐标 (x, y)，单位 UNIT_SUFFIX，返回 Future
+        斜向移动耗时取决于位移较大的轴
+        """
+        return self.track("move_to", self.stepper.submit_move(self.plan_move_to(x, y)))
+
+    def plan_move_to(self, x, y):
+        """
+        规划到坐标 (x, y) 的联动但不执行，相对当前排队目标位置计算，
+        需在其他运动加入队列之前用 stepper.submit_move 提交
+        """
+        targets = (
+            ("LR", round(x / UNIT * STEPS_PER_UNIT_LR_UD)),
+            ("UD", -round(y / UNIT * STEPS_PER_UNIT_LR_UD)),
+        )
+        step_size, tables = STEP_TABLES[STEP_MODE]
+        tracks = []
+        for axis, target in targets:
+            delta = target - self.stepper.get_target(axis)
+            direction = 1 if delta >= 0 else -1
+            tracks.append(
+                AxisTrack(
+                    axis,
+                    self.axis_pins(axis),
+                    tables[direction],
+                    abs(delta) // step_size,
+                    direction,
+                    step_size,
+                )
+            )
+        return self.stepper.plan(
+            tracks,
+            profile=min(
+                AXIS_PROFILES["LR"], AXIS_PROFILES["UD"], key=lambda p: p.max_speed
+            ),
+        )
+
+    def shoot_pulse(self, camera=False):
+        """
+        脉冲发射，camera 为 True 时同时触发高速摄影机（提前 FAST_CAM_LEAD）
+        硬件触发时两个脉冲由 PCA9685 一次装载，相对相位不受调度抖动影响
+        """
+        started = time.perf_counter_ns()
+        if self.trigger is not None:
+            pulses = {"shot": (FAST_CAM_LEAD if camera else 0, SHOOT_INTERVAL)}
+            if camera:
+                pulses["camera"] = (0, FAST_CAM_INTERVAL)
+            self.trigger.fire(pulses)
+        else:
+            if camera:
+                self.fast_cam_start()
+            self.send_pulse(REACTION_GENERATOR_PIN, SHOOT_INTERVAL)  # 10ms
+        self.perf["shoot"].record(time.perf_counter_ns() - started)
+
+    def pulse_train(self, count, frequency, width=SHOOT_INTERVAL, hardware=False):
+        """
+        发射脉冲串：count 个脉冲，频率 frequency Hz，脉宽 width 秒，返回 Future，
+        结果为实际脉冲数、频率与脉宽误差
+        hardware 为 True 时由硬件 PWM（PULSE_PWM）输出，否则按截止时刻输出 GPIO
+        """
+        return self.pulse_trains.start(count, frequency, width, hardware)
+
+    def abort_pulse_train(self):
+        """
+        中止排队及正在输出的脉冲串
+        """
+        self.pulse_trains.abort()
 
     def fast_cam_start(self):
         """
         高速摄影机开始录制
         """
-        for pin in FAST_CAM_PIN:
-            GPIO.output(pin, GPIO.HIGH)
-            time.sleep(0.005)  # the high level will last 0.005s(5ms)
-            GPIO.output(pin, GPIO.LOW)
+        if self.trigger is not None:
+            self.trigger.fire({"camera": (0, FAST_CAM_INTERVAL)})
+            return
+        self.send_pulse(FAST_CAM_PIN, FAST_CAM_INTERVAL)  # 5ms
+
+    def start_scan(self, points, settle=SCAN_SETTLE, camera=False, order="serpentine"):
+        """
+        光栅扫描：依次移动到 points 中的各点并发射，返回 Future，结果为扫描统计
+        order: serpentine 蛇形，nearest 最近邻，none 保持原顺序
+        """
+        if self.scanner is not None and not self.scanner.future.done():
+            logger.warning("Scan is already running")
+            return self.scanner.future
+        self.halted = False
+        self.scanner = RasterScan(
+            self, points, settle=settle, camera=camera, order=order
+        )
+        return self.scanner.start()
+
+    def abort_scan(self):
+        """
+        中止正在进行的光栅扫描
+        """
+        if self.scanner is not None and not self.scanner.future.done():
+            self.scanner.cancel()
+
+    def log_timing_stats(self):
+        """
+        输出步进与脉冲的时间抖动统计
+        """
+        for name, recorder in (
+            ("step", self.stepper.timing),
+            ("pulse", self.pulse_timing),
+            ("input", self.input_latency.recorder),
+        ):
+            stats = recorder.stats()
+            logger.info(
+                "Timing[%s][count:%s][mean:%.1fus][std:%.1fus][max:%.1fus]"
+                % (
+                    name,
+                    stats["count"],
+                    stats["mean_us"],
+                    stats["std_us"],
+                    stats["max_us"],
+                )
+            )
+        for name, histogram in self.perf.items():
+            stats = histogram.stats()
+            if stats["count"]:
+                logger.info(
+                    "Latency[%s][count:%s][p50:%s][p99:%s][max:%s]"
+                    % (
+                        name,
+                        stats["count"],
+                        format_us(stats["p50_us"]),
+                        format_us(stats["p99_us"]),
+                        format_us(stats["max_us"]),
+                    )
+                )
+
+    def perf_stats(self):
+        """
+        性能快照：帧率、每轮处理的事件数、各动作耗时直方图统计与按键延迟
+        """
+        return {
+            "fps": round(self.frame_rate.rate(), 1),
+            "events_per_loop": {
+                "last": self.events_per_loop,
+                "max": self.events_per_loop_max,
+            },
+            "latency": {name: h.stats() for name, h in self.perf.items()},
+            "input": self.input_latency.stats(),
+        }
+
+    def draw_overlay(self):
+        """
+        性能浮层：左上角显示帧率、每轮处理的事件数与各动作耗时，每 OVERLAY_REFRESH 秒更新
+        数字每次都不同，直接渲染，不进入文字缓存
+        """
+        now = time.perf_counter()
+        if now < self.overlay_next:
+            return
+        self.overlay_next = now + OVERLAY_REFRESH
+        stats = self.perf_stats()
+        events = stats["events_per_loop"]
+        lines = [
+            "FPS %.1f  events/loop %s (max %s)"
+            % (stats["fps"], events["last"], events["max"])
+        ]
+        for name, item in stats["latency"].items():
+            lines.append(
+                "%s  n=%s  p50 %s  p99 %s  max %s"
+                % (
+                    name,
+                    item["count"],
+                    format_us(item["p50_us"]),
+                    format_us(item["p99_us"]),
+                    format_us(item["max_us"]),
+                )
+            )
+        font = get_font(OVERLAY_FONT_SIZE, False, False, False)
+        surfaces = [font.render(line, True, WIHTE_COLOR) for line in lines]
+        rect = pygame.Rect(
+            OVERLAY_POS,
+            (
+                max(surface.get_width() for surface in surfaces) + 8,
+                sum(surface.get_height() for surface in surfaces) + 8,
+            ),
+        )
+        self.clear_overlay()
+        self.screen.fill(OVERLAY_COLOR, rect)
+        y = rect.y + 4
+        for surface in surfaces:
+            self.screen.blit(surface, (rect.x + 4, y))
+            y += surface.get_height()
+        self.overlay_rect = rect
+        self.dirty_rects.append(rect)
+
+    def clear_overlay(self):
+        if self.overlay_rect is not None:
+            self.screen.blit(self.background, self.overlay_rect, self.overlay_rect)
+            self.dirty_rects.append(self.overlay_rect)
+            self.overlay_rect = None
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.overlay_next = 0
+        if not self.overlay:
+            self.clear_overlay()
 
     def LED_control(self, action):
         """
         LED控制
         """
         if action == "start":
-            for pin in LED_PIN:
-                GPIO.output(pin, GPIO.HIGH)
+            self.gpio_output(LED_PIN, GPIO.HIGH)
         elif action == "stop":
-            for pin in LED_PIN:
-                GPIO.output(pin, GPIO.LOW)
+            self.gpio_output(LED_PIN, GPIO.LOW)
         else:
             logger.error("Unknown action: %s" % action)
 
@@ -472,84 +1145,279 @@ class RotateController:
         温控器控制
         """
         if action == "start":
-            for pin in THERMOSTAT_PIN:
-                GPIO.output(pin, GPIO.HIGH)
+            self.gpio_output(THERMOSTAT_PIN, GPIO.HIGH)
         elif action == "stop":
-            for pin in THERMOSTAT_PIN:
-                GPIO.output(pin, GPIO.LOW)
+            self.gpio_output(THERMOSTAT_PIN, GPIO.LOW)
         else:
             logger.error("Unknown action: %s" % action)
 
+    def set_outputs(self, led=None, thermostat=None, relay=None):
+        """
+        同时切换多路开关量（True 打开，False 关闭，None 不变），一次 GPIO 调用完成
+        """
+        pins = []
+        values = []
+        groups = ((LED_PIN, led), (THERMOSTAT_PIN, thermostat), (RELAY_PINS, relay))
+        for group, level in groups:
+            if level is not None:
+                pins += group
+                values += [GPIO.HIGH if level else GPIO.LOW] * len(group)
+        if pins:
+            self.gpio_output(pins, values)
+
+    def emergency_stop(self):
+        """
+        急停：舵机全部通道关闭（单次 I2C 传输），输出引脚全部拉低
+        """
+        logger.warning("Emergency stop")
+        self.halted = True
+        self.abort_scan()
+        self.abort_pulse_train()
+        self.stepper.cancel()
+        self.abort_reaction()
+        # 打断正在进行的舵机运动，等它退出后再关闭，之后不会再有舵机写入
+        self.servo_stop.set()
+        with self.servo_lock:
+            self.boards.allOff()
+            self.servo_stop.clear()
+        self.gpio_output(CONTROLLER_PINS, GPIO.LOW)
+        if MOTION_PROCESS:
+            self.stepper.halt()
+
+    def key_down(self, key):
+        """
+        处理按键并记录按键到第一次硬件输出的延迟
+        """
+        self.input_latency.arm()
+        self.handle_key(key)
+        if not self.output_pending():
+            # 按键没有产生任何硬件输出，撤销计时，避免计入下一次无关的写入
+            self.input_latency.disarm()
+
+    def handle_key(self, key):
+        """
+        按键处理
+        """
+        if key in KEY_AXIS:  # 位移台步进电机
+            self.rotate(key)
+        elif key == pygame.K_v:  # 液滴发射控制
+            self.shoot_pulse()
+        elif key == pygame.K_n:  # 舵机微调，角度减小
+            self.servo_rotate(
+                start_angle=self.servo_current_angle,
+                end_angle=self.servo_current_angle - (1 * SERVO_MINITRIM_RESOLUTION),
+                resolution=SERVO_MINITRIM_RESOLUTION,
+                record_angle=True,
+                gap_duration=SERVO_GAP_DURATION,
+            )
+        elif key == pygame.K_m:  # 舵机微调，角度增大
+            self.servo_rotate(
+                start_angle=self.servo_current_angle,
+                end_angle=self.servo_current_angle + (1 * SERVO_MINITRIM_RESOLUTION),
+                resolution=SERVO_MINITRIM_RESOLUTION,
+                record_angle=True,
+                gap_duration=SERVO_GAP_DURATION,
+            )
+        elif key == pygame.K_b:  #  液滴到达最终位置停留一段时间再回来
+            self.start_reaction()
+        elif key == pygame.K_a:  # 中止反应流程
+            self.abort_reaction()
+        elif key == pygame.K_p:  # 性能浮层
+            self.toggle_overlay()
+        elif key == pygame.K_t:  # 导出硬件动作追踪
+            self.dump_trace()
+        elif key == pygame.K_SPACE:  # 急停
+            self.emergency_stop()
+        elif key == pygame.K_ESCAPE:  # 退出程序
+            self.shutdown()
+            exit(0)
+
+    def reaction_steps(self, prep=None):
+        """
+        反应流程（b 键），流程在后台执行，不阻塞按键
+        prep: 与停留时间并行执行的步骤，例如 Step("next", ..., after="rise")
+              为下一次拍摄移动位移台
+        """
+        steps = [
+            # 1. 打开 LED
+            Step("led_on", lambda: self.LED_control(action="start")),
+            # 2. 相机开始录制
+            Step("camera", self.fast_cam_start, after="led_on"),
+            # 3. 反应台上升
+            Step(
+                "rise",
+                lambda: self.servo_rotate(
+                    start_angle=self.servo_current_angle,
+                    end_angle=SERVO_FINAL_ANGLE,
+                    resolution=SERVO_FINAL_RESOLUTION,
+                    gap_duration=SERVO_GAP_DURATION,
+                    stop=self.reaction_stop,
+                ),
+                after="camera",
+            ),
+            # 4. 停留足够的反应时间后 5. 温控器停止工作
+            Step(
+                "thermostat_off",
+                lambda: self.thermostat_control(action="stop"),
+                after="rise",
+                delay=SERVO_FINAL_STAY_DURATION,
+            ),
+            # 6. LED停止工作
+            Step(
+                "led_off",
+                lambda: self.LED_control(action="stop"),
+                after="thermostat_off",
+            ),
+            # 7. 相机停止工作
+            # 8. 反应台下降
+            Step(
+                "fall",
+                lambda: self.servo_rotate(
+                    start_angle=SERVO_FINAL_ANGLE,
+                    end_angle=self.servo_current_angle,
+                    resolution=SERVO_FINAL_RESOLUTION,
+                    gap_duration=SERVO_RESET_GAP_DURATION,
+                    stop=self.reaction_stop,
+                ),
+                after="led_off",
+            ),
+        ]
+        return steps + list(prep or [])
+
+    def start_reaction(self, prep=None):
+        """
+        启动反应流程，返回 Future，结果为各步骤的时间戳
+        """
+        if self.reaction is not None and not self.reaction.done():
+            logger.warning("Reaction sequence is already running")
+            return self.reaction
+        self.halted = False
+        self.reaction_stop = threading.Event()
+        self.reaction = self.sequencer.start(
+            self.reaction_steps(prep), cleanup=[self.reaction_cleanup]
+        )
+        return self.reaction
+
+    def output_pending(self):
+        """
+        是否还有后台动作会产生硬件输出（步进运动、脉冲串、反应流程）
+        """
+        return (
+            self.stepper.busy()
+            or self.pulse_trains.busy()
+            or (self.reaction is not None and not self.reaction.done())
+        )
+
+    def abort_reaction(self):
+        """
+        中止正在进行的反应流程
+        """
+        if self.reaction is not None and not self.reaction.done():
+            self.reaction_stop.set()
+            self.reaction.cancel()
+
+    def reaction_cleanup(self):
+        """
+        反应流程中止后复位：LED 关闭，反应台回到原位（急停时不再驱动舵机）
+        """
+        self.LED_control(action="stop")
+        # 等待仍在线程池中执行的舵机步骤退出后再复位
+        with self.servo_lock:
+            if not self.halted:
+                count = self.servo_calibration(SERVO_CHANNEL).count(
+                    self.servo_current_angle
+                )
+                self.boards.setPWM(SERVO_CHANNEL, 0, count)
+
+    def dump_trace(self, prefix=TRACE_FILE_PREFIX):
+        """
+        导出硬件动作追踪：prefix.bin（二进制）与 prefix.json（Chrome trace）
+        """
+        if not TRACER.enabled:
+            logger.warning("Tracing is off, set RIG_TRACE=1 to enable")
+            return
+        count = TRACER.dump_binary(prefix + ".bin")
+        TRACER.dump_chrome(prefix + ".json")
+        logger.info("Dumped %s trace records to %s.{bin,json}", count, prefix)
+
+    def shutdown(self):
+        """
+        停止电机、输出统计并释放硬件
+        """
+        self.abort_scan()
+        self.abort_pulse_train()
+        self.abort_reaction()
+        self.sequencer.stop()  # 等待中止流程的清理完成
+        self.stepper.stop()
+        self.pulse_trains.close()
+        self.log_timing_stats()
+        if TRACER.enabled:
+            self.dump_trace()
+        if not self.headless:
+            pygame.quit()
+        GPIO.cleanup()
+        self.boards.exit()
+
+    def run(self):
+        """
+        主循环：空闲时阻塞等待事件，位移台运动时按帧率上限刷新标记点
+        """
+        # 窗口被遮挡或从最小化恢复时需要整屏刷新（pygame 1 没有 WINDOWEXPOSED）
+        expose = {pygame.VIDEOEXPOSE, getattr(pygame, "WINDOWEXPOSED", None)} - {None}
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN, *expose])
+        clock = pygame.time.Clock()
+        while True:
+            if self.stepper.busy() or self.dirty_rects:
+                # 轮询时同样按帧率让出 CPU，避免空转占满核心、与步进线程争抢 GIL
+                clock.tick(FRAME_RATE)
+                events = pygame.event.get()
+            else:
+                events = [pygame.event.wait(IDLE_WAIT_MS)]
+            self.events_per_loop = sum(1 for e in events if e.type != pygame.NOEVENT)
+            self.events_per_loop_max = max(
+                self.events_per_loop_max, self.events_per_loop
+            )
+            for event in events:
+                if event.type == pygame.QUIT:
+                    self.shutdown()
+                    exit(0)
+                if event.type == pygame.KEYDOWN:
+                    self.key_down(event.key)
+                elif event.type in expose:
+                    self.redraw_all()
+            started = time.perf_counter_ns()
+            # 标记点跟随位移台实际位置
+            self.move_point()
+            if self.overlay:
+                self.draw_overlay()
+            if self.dirty_rects:
+                self.update_display()
+                self.perf["redraw"].record(time.perf_counter_ns() - started)
+                self.frame_rate.tick()
+
+    def serve(self, path=DEFAULT_SOCKET):
+        """
+        无界面模式的主循环：在 path 上提供命令服务，收到 SIGINT / SIGTERM 后退出
+        """
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+        server = CommandServer(self, path=path).start()
+        logger.info("Headless mode, serving commands on %s", path)
+        try:
+            while not stop.wait(IDLE_WAIT_MS / 1000):
+                pass
+        finally:
+            server.stop()
+            self.shutdown()
+
 
 if __name__ == "__main__":
     rotate_controller = RotateController(
         width=SCREEN_WIDTH, height=SCREEN_HEIGHT, title=SCREEN_TITLE
     )
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit(0)
-            if event.type == pygame.KEYDOWN:
-                if event.key in [
-                    pygame.K_LEFT,
-                    pygame.K_RIGHT,
-                    pygame.K_UP,
-                    pygame.K_DOWN,
-                    pygame.K_d,
-                    pygame.K_s,
-                ]:  # 位移台步进电机
-                    rotate_controller.rotate(event.key)
-                    rotate_controller.move_point(event.key)
-                elif event.key == pygame.K_v:  # 液滴发射控制
-                    rotate_controller.shoot_pulse()
-                elif event.key == pygame.K_n:  # 舵机微调，角度减小
-                    rotate_controller.servo_rotate(
-                        start_angle=rotate_controller.servo_current_angle,
-                        end_angle=rotate_controller.servo_current_angle
-                        - (1 * SERVO_MINITRIM_RESOLUTION),
-                        resolution=SERVO_MINITRIM_RESOLUTION,
-                        record_angle=True,
-                        gap_duration=SERVO_GAP_DURATION,
-                    )
-                elif event.key == pygame.K_m:  # 舵机微调，角度增大
-                    rotate_controller.servo_rotate(
-                        start_angle=rotate_controller.servo_current_angle,
-                        end_angle=rotate_controller.servo_current_angle
-                        + (1 * SERVO_MINITRIM_RESOLUTION),
-                        resolution=SERVO_MINITRIM_RESOLUTION,
-                        record_angle=True,
-                        gap_duration=SERVO_GAP_DURATION,
-                    )
-                elif event.key == pygame.K_b:  #  液滴到达最终位置停留一段时间再回来
-                    # 1. 打开 LED
-                    rotate_controller.LED_control(action="start")
-                    # 2. 相机开始录制
-                    rotate_controller.fast_cam_start()
-                    # 3. 反应台上升
-                    rotate_controller.servo_rotate(
-                        start_angle=rotate_controller.servo_current_angle,
-                        end_angle=SERVO_FINAL_ANGLE,
-                        resolution=SERVO_FINAL_RESOLUTION,
-                        gap_duration=SERVO_GAP_DURATION,
-                    )
-                    # 4. 停留足够的反应时间
-                    time.sleep(SERVO_FINAL_STAY_DURATION)
-                    # 5. 温控器停止工作
-                    rotate_controller.thermostat_control(action="stop")
-                    # 6. LED停止工作
-                    rotate_controller.LED_control(action="stop")
-                    # 7. 相机停止工作
-                    # 8. 反应台下降
-                    rotate_controller.servo_rotate(
-                        start_angle=SERVO_FINAL_ANGLE,
-                        end_angle=rotate_controller.servo_current_angle,
-                        resolution=SERVO_FINAL_RESOLUTION,
-                        gap_duration=SERVO_RESET_GAP_DURATION,
-                    )
-                elif event.key == pygame.K_ESCAPE:  # 退出程序
-                    pygame.quit()
-                    GPIO.cleanup()
-                    rotate_controller.servo.exit_PCA9685()
-                    exit(0)
-        pygame.display.flip()
+    if rotate_controller.headless:
+        rotate_controller.serve()
+    else:
+        rotate_controller.run()
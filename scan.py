@@ -0,0 +1,158 @@
+"""
+光栅扫描：位移台依次移动到一组坐标点，每个点 移动 -> 稳定 -> 发射 -> （可选）相机触发
+坐标单位与 rotateController 的 UNIT_SUFFIX 相同；稳定等待期间规划下一次移动，
+发射后立即提交，节拍只受机械运动与稳定时间限制
+"""
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+
+from timing import TimingRecorder, sleep_until
+
+logger = logging.getLogger(name="Scan")
+
+SCAN_SETTLE = 50 / 1000  # 到位后的稳定时间，单位秒
+SCAN_LOG_EVERY = 500  # 每发射多少次输出一次进度
+
+
+def grid(x_start, y_start, x_end, y_end, pitch):
+    """
+    矩形网格上的坐标点，按行排列（含两端点）
+    """
+    nx = int(round(abs(x_end - x_start) / pitch)) + 1
+    ny = int(round(abs(y_end - y_start) / pitch)) + 1
+    sx = pitch if x_end >= x_start else -pitch
+    sy = pitch if y_end >= y_start else -pitch
+    return [
+        (round(x_start + i * sx, 6), round(y_start + j * sy, 6))
+        for j in range(ny)
+        for i in range(nx)
+    ]
+
+
+def serpentine(points):
+    """
+    蛇形顺序：按 y 分行，奇数行反向，行与行之间只移动一个间距
+    """
+    rows = {}
+    for x, y in points:
+        rows.setdefault(y, []).append((x, y))
+    ordered = []
+    for i, y in enumerate(sorted(rows)):
+        ordered += sorted(rows[y], reverse=i % 2 == 1)
+    return ordered
+
+
+def nearest_neighbor(points, start=(0, 0)):
+    """
+    最近邻顺序：每次走到离当前位置最近的点
+    两轴联动，移动耗时取决于位移较大的轴，因此按切比雪夫距离比较
+    """
+    remaining = list(points)
+    ordered = []
+    x, y = start
+    while remaining:
+        best = 0
+        best_distance = None
+        for i, (px, py) in enumerate(remaining):
+            distance = max(abs(px - x), abs(py - y))
+            if best_distance is None or distance < best_distance:
+                best, best_distance = i, distance
+        # 与末尾交换后弹出，避免列表中间删除
+        remaining[best], remaining[-1] = remaining[-1], remaining[best]
+        x, y = remaining.pop()
+        ordered.append((x, y))
+    return ordered
+
+
+ORDERS = {"serpentine": serpentine, "nearest": nearest_neighbor, "none": list}
+
+
+class RasterScan:
+    """
+    在后台线程中执行一次扫描，start 返回 Future，结果为统计信息
+    """
+
+    def __init__(
+        self, controller, points, settle=SCAN_SETTLE, camera=False, order="serpentine"
+    ):
+        self.controller = controller
+        if order == "nearest":
+            self.points = nearest_neighbor(points, controller.current_point())
+        else:
+            self.points = ORDERS[order](points)
+        self.settle_ns = int(settle * 1e9)
+        self.camera = camera
+        self.shots = 0
+        self.settle_timing = TimingRecorder()  # 稳定结束的目标时刻与实际发射时刻
+        self.future = Future()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.future.set_running_or_notify_cancel()
+        self._thread = threading.Thread(
+            target=self._run, name="RasterScan", daemon=True
+        )
+        self._thread.start()
+        return self.future
+
+    def cancel(self):
+        """
+        中止扫描：当前移动被取消，已发射的点不受影响
+        """
+        self._stop.set()
+        self.controller.stepper.cancel()
+
+    def _run(self):
+        try:
+            result = self._scan()
+        except Exception as e:
+            logger.exception("Scan failed")
+            self.future.set_exception(e)
+        else:
+            self.future.set_result(result)
+
+    def _scan(self):
+        controller = self.controller
+        stepper = controller.stepper
+        started = time.perf_counter()
+        if not self.points:
+            return self._result(started)
+        moving = stepper.submit_move(controller.plan_move_to(*self.points[0]))
+        for i in range(len(self.points)):
+            try:
+                moving.result()
+            except CancelledError:
+                break
+            if self._stop.is_set():
+                break
+            deadline = time.perf_counter_ns() + self.settle_ns
+            # 稳定等待期间规划下一次移动，此时没有其他运动入队，目标位置即当前点
+            if i + 1 < len(self.points):
+                move = controller.plan_move_to(*self.points[i + 1])
+            else:
+                move = None
+            actual = sleep_until(deadline)
+            self.settle_timing.record(deadline, actual)
+            if self._stop.is_set():
+                break
+            controller.shoot_pulse(camera=self.camera)
+            self.shots += 1
+            if self.shots % SCAN_LOG_EVERY == 0:
+                logger.info("Scan: %s/%s shots", self.shots, len(self.points))
+            # 发射期间可能收到急停，此时不能再提交下一次移动
+            if move is None or self._stop.is_set():
+                break
+            moving = stepper.submit_move(move)
+        return self._result(started)
+
+    def _result(self, started):
+        seconds = time.perf_counter() - started
+        return {
+            "shots": self.shots,
+            "points": len(self.points),
+            "seconds": round(seconds, 3),
+            "rate": round(self.shots / seconds, 2) if seconds > 0 else 0,
+        }
@@ -0,0 +1,117 @@
+import asyncio
+import concurrent.futures
+import inspect
+import logging
+import threading
+
+logger = logging.getLogger(name="Sequencer")
+
+STOP_TIMEOUT = 5  # stop 等待流程结束的时间，单位秒
+
+
+class Step:
+    """
+    流程中的一个步骤
+    name: 步骤名，供其他步骤的 after 引用
+    action: 普通函数（在线程池中执行）或协程函数；为 None 时只作为时间点
+    at: 相对流程开始的绝对时刻，单位秒
+    after: 依赖的步骤名或列表，全部结束后再等待 delay 秒开始
+    """
+
+    def __init__(self, name, action=None, at=None, after=None, delay=0):
+        self.name = name
+        self.action = action
+        self.at = at
+        if isinstance(after, str):
+            after = [after]
+        self.after = after or []
+        self.delay = delay
+
+
+class Sequencer:
+    """
+    基于 asyncio 的实验流程引擎：事件循环运行在独立线程，
+    没有依赖关系的步骤并行执行，流程可随时取消
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="Sequencer", daemon=True
+        )
+        self._thread.start()
+
+    def start(self, steps, cleanup=None):
+        """
+        启动流程，返回 concurrent.futures.Future
+        结果为 {步骤名: (开始时刻, 结束时刻)}，单位秒，相对流程开始
+        cleanup: 流程被取消时执行的函数列表
+        """
+        names = set(step.name for step in steps)
+        for step in steps:
+            for name in step.after:
+                if name not in names:
+                    raise ValueError(
+                        "Step[%s] depends on unknown step[%s]" % (step.name, name)
+                    )
+        return asyncio.run_coroutine_threadsafe(
+            self._run(steps, cleanup or []), self.loop
+        )
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """
+        结束事件循环线程；先等待仍在执行的流程（例如已取消、正在清理的）结束
+        """
+        if not self._thread.is_alive():
+            return
+
+        async def drain():
+            current = asyncio.current_task()
+            tasks = [task for task in asyncio.all_tasks() if task is not current]
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(drain(), self.loop).result(timeout)
+        except concurrent.futures.TimeoutError:
+            logger.warning("Sequence still running after %ss, stopping anyway", timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    async def _run(self, steps, cleanup):
+        t0 = self.loop.time()
+        finished = {step.name: asyncio.Event() for step in steps}
+        timestamps = {}
+
+        async def run_step(step):
+            if step.after:
+                for name in step.after:
+                    await finished[name].wait()
+                base = max(timestamps[name][1] for name in step.after) + t0
+                start_at = base + step.delay
+            else:
+                start_at = t0 + (step.at if step.at is not None else step.delay)
+            await asyncio.sleep(max(0, start_at - self.loop.time()))
+            start = self.loop.time()
+            if step.action is not None:
+                if inspect.iscoroutinefunction(step.action):
+                    await step.action()
+                else:
+                    await self.loop.run_in_executor(None, step.action)
+            timestamps[step.name] = (start - t0, self.loop.time() - t0)
+            logger.debug(
+                "Step[%s][start:%.3fs][end:%.3fs]"
+                % (step.name, timestamps[step.name][0], timestamps[step.name][1])
+            )
+            finished[step.name].set()
+
+        tasks = [asyncio.ensure_future(run_step(step)) for step in steps]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            logger.warning("Sequence aborted, running cleanup")
+            for action in cleanup:
+                await self.loop.run_in_executor(None, action)
+            raise
+        return timestamps
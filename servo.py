@@ -0,0 +1,105 @@
+"""
+舵机运动规划：角度直接换算为 PCA9685 12 位计数，运动前生成完整的计数序列
+"""
+import math
+from array import array
+
+PWM_PERIOD_US = 20000  # 50Hz
+PWM_RESOLUTION = 4096  # 12-bit
+
+
+def linear(t):
+    return t
+
+
+def ease_in_out(t):
+    """
+    余弦缓动：起止速度为 0
+    """
+    return (1 - math.cos(math.pi * t)) / 2
+
+
+EASINGS = {"linear": linear, "ease_in_out": ease_in_out}
+
+
+class ServoCalibration:
+    """
+    单个通道的舵机标定，预先生成 角度 -> 计数 表
+    min_pulse_us / max_pulse_us: 0 度与 max_angle 对应的脉宽
+    table_resolution: 表的角度间隔
+    """
+
+    def __init__(
+        self,
+        min_pulse_us=501,
+        max_pulse_us=2501,
+        max_angle=180,
+        period_us=PWM_PERIOD_US,
+        table_resolution=0.01,
+    ):
+        self.max_angle = max_angle
+        self.table_resolution = table_resolution
+        size = int(round(max_angle / table_resolution)) + 1
+        us_per_step = (max_pulse_us - min_pulse_us) / (size - 1)
+        self.table = array(
+            "H",
+            (
+                int((min_pulse_us + i * us_per_step) * PWM_RESOLUTION / period_us)
+                for i in range(size)
+            ),
+        )
+
+    def contains(self, angle):
+        return 0 <= angle <= self.max_angle
+
+    def count(self, angle):
+        if not self.contains(angle):
+            raise ValueError("Angle out of range: %s" % angle)
+        return self.table[int(round(angle / self.table_resolution))]
+
+
+def plan_counts(calibration, start_angle, end_angle, steps, easing="linear"):
+    """
+    生成从 start_angle 到 end_angle 的计数序列，共 steps + 1 个点（含起点与终点）
+    """
+    ease = EASINGS[easing]
+    steps = max(int(steps), 1)
+    span = end_angle - start_angle
+    return array(
+        "H",
+        (
+            calibration.count(start_angle + span * ease(i / steps))
+            for i in range(steps + 1)
+        ),
+    )
+
+
+class ServoTimeline:
+    """
+    多通道同步运动：各通道在同一时长（steps 个节拍）内从起点运动到各自的目标
+    每个节拍只保留计数发生变化的通道，预先组装为 {通道: (on, off)}，
+    运动中每个节拍直接交给 setPWMBatch 一次写入
+    """
+
+    def __init__(self, calibrations, starts, targets, steps, easing="linear"):
+        self.channels = sorted(targets)
+        self.steps = max(int(steps), 1)
+        columns = [
+            plan_counts(
+                calibrations[channel],
+                starts[channel],
+                targets[channel],
+                self.steps,
+                easing,
+            )
+            for channel in self.channels
+        ]
+        self.frames = []
+        last = {}
+        for i in range(self.steps + 1):
+            frame = {}
+            for channel, counts in zip(self.channels, columns):
+                if last.get(channel) != counts[i]:
+                    last[channel] = counts[i]
+                    frame[channel] = (0, counts[i])
+            self.frames.append(frame)
@@ -0,0 +1,208 @@
+"""
+硬件模拟器：在没有树莓派的环境中代替 RPi.GPIO 与 smbus，
+统计 I2C 传输次数、按总线时钟估算传输耗时，并记录引脚电平变化
+"""
+import time
+from array import array
+
+# I2C 每个字节 8 位数据 + 1 位应答
+I2C_BITS_PER_BYTE = 9
+# 起始位 + 停止位
+I2C_FRAME_BITS = 2
+
+
+class SimSMBus:
+    """
+    模拟 smbus.SMBus，寄存器保存在内存中
+    """
+
+    def __init__(self, bus_id=1, clock_hz=100_000, realtime=False):
+        self.bus_id = bus_id
+        self.clock_hz = clock_hz
+        self.realtime = realtime  # 为 True 时按估算的总线耗时实际等待
+        self.registers = {}  # (address, reg) -> value
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.transactions = 0
+        self.bytes = 0
+        self.bus_time_ns = 0
+
+    def _transfer(self, nbytes, restarts=0):
+        bits = nbytes * I2C_BITS_PER_BYTE + I2C_FRAME_BITS + restarts
+        duration_ns = bits * 1_000_000_000 // self.clock_hz
+        self.transactions += 1
+        self.bytes += nbytes
+        self.bus_time_ns += duration_ns
+        if self.realtime:
+            deadline = time.perf_counter_ns() + duration_ns
+            while time.perf_counter_ns() < deadline:
+                pass
+
+    def _store(self, address, reg, value):
+        # PCA9685 ALL_LED 寄存器写入后反映到全部通道
+        if 0xFA <= reg <= 0xFD:
+            for channel in range(16):
+                self.registers[(address, 0x06 + 4 * channel + reg - 0xFA)] = value
+            return
+        self.registers[(address, reg)] = value
+
+    def write_byte_data(self, address, reg, value):
+        self._transfer(3)
+        self._store(address, reg, value & 0xFF)
+
+    def write_i2c_block_data(self, address, reg, values):
+        values = list(values)
+        self._transfer(2 + len(values))
+        for i, value in enumerate(values):
+            self._store(address, reg + i, value & 0xFF)
+
+    def read_byte_data(self, address, reg):
+        self._transfer(4, restarts=1)
+        return self.registers.get((address, reg), 0)
+
+    def read_i2c_block_data(self, address, reg, length):
+        self._transfer(3 + length, restarts=1)
+        return [self.registers.get((address, reg + i), 0) for i in range(length)]
+
+    def close(self):
+        pass
+
+
+class SimGPIO:
+    """
+    模拟 RPi.GPIO 模块接口，记录每次电平变化 (时间戳 ns, 引脚, 电平)
+    """
+
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    SERIAL = 40
+    SPI = 41
+    I2C = 42
+    HARD_PWM = 43
+    UNKNOWN = -1
+
+    def __init__(self, edge_capacity=65536):
+        self.mode = None
+        self.functions = {}  # pin -> IN/OUT
+        self.levels = {}  # pin -> 电平
+        self.edge_capacity = edge_capacity
+        self.edge_ns = array("q", bytes(8 * edge_capacity))
+        self.edge_pins = array("h", bytes(2 * edge_capacity))
+        self.edge_levels = array("b", bytes(edge_capacity))
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.calls = 0
+        self.edge_count = 0
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def getmode(self):
+        return self.mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, channel, direction, pull_up_down=None, initial=None):
+        for pin in self._pins(channel):
+            self.functions[pin] = direction
+            if direction == self.OUT:
+                self._set(pin, initial if initial is not None else self.LOW)
+
+    def gpio_function(self, pin):
+        return self.functions.get(pin, self.IN)
+
+    def output(self, channel, value):
+        self.calls += 1
+        pins = self._pins(channel)
+        if isinstance(value, (list, tuple)):
+            values = value
+        else:
+            values = [value] * len(pins)
+        for pin, level in zip(pins, values):
+            self._set(pin, 1 if level else 0)
+
+    def input(self, pin):
+        return self.levels.get(pin, self.LOW)
+
+    def cleanup(self, channel=None):
+        if channel is None:
+            self.functions.clear()
+            self.levels.clear()
+        else:
+            for pin in self._pins(channel):
+                self.functions.pop(pin, None)
+                self.levels.pop(pin, None)
+
+    def edges(self):
+        """
+        按时间顺序返回记录的电平变化 [(ns, pin, level), ...]
+        """
+        n = min(self.edge_count, self.edge_capacity)
+        start = self.edge_count - n
+        result = []
+        for i in range(start, start + n):
+            index = i % self.edge_capacity
+            result.append(
+                (self.edge_ns[index], self.edge_pins[index], self.edge_levels[index])
+            )
+        return result
+
+    def _pins(self, channel):
+        return list(channel) if isinstance(channel, (list, tuple)) else [channel]
+
+    def _set(self, pin, level):
+        if self.levels.get(pin) == level:
+            return
+        self.levels[pin] = level
+        index = self.edge_count % self.edge_capacity
+        self.edge_ns[index] = time.perf_counter_ns()
+        self.edge_pins[index] = pin
+        self.edge_levels[index] = level
+        self.edge_count += 1
+
+
+class SimPWM:
+    """
+    模拟内核硬件 PWM 通道，记录每次启用与停止的时刻，按周期推算输出的脉冲数
+    """
+
+    def __init__(self, chip=0, channel=0):
+        self.chip = chip
+        self.channel = channel
+        self.period_ns = 0
+        self.duty_ns = 0
+        self.enabled = False
+        self.enabled_ns = 0
+        self.pulses = 0  # 累计输出的完整脉冲数
+
+    def configure(self, period_ns, duty_ns):
+        self.disable()
+        self.period_ns = int(period_ns)
+        self.duty_ns = int(duty_ns)
+
+    def enable(self):
+        self.enabled = True
+        self.enabled_ns = time.perf_counter_ns()
+        return self.enabled_ns
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        elapsed = time.perf_counter_ns() - self.enabled_ns
+        # 启用时从一个周期的起点开始输出
+        full, rest = divmod(elapsed, self.period_ns)
+        self.pulses += full + (1 if rest >= self.duty_ns else 0)
+
+    def close(self):
+        self.disable()
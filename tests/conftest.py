@@ -0,0 +1,18 @@
+import os
+
+import pytest
+
+# 测试在模拟后端、无界面模式下运行
+os.environ.setdefault("RIG_BACKEND", "sim")
+os.environ.setdefault("RIG_HEADLESS", "1")
+
+
+@pytest.fixture
+def controller(monkeypatch, tmp_path):
+    import rotateController
+
+    # 自检缓存写到临时目录，不覆盖开发机上的缓存
+    monkeypatch.setattr(rotateController, "PIN_TEST_CACHE", str(tmp_path / "pins.json"))
+    controller = rotateController.RotateController(800, 800, "test")
+    yield controller
+    controller.shutdown()
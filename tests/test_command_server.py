@@ -0,0 +1,42 @@
+import pytest
+
+from commandServer import CommandClient, CommandServer
+
+
+@pytest.fixture
+def client(controller, tmp_path):
+    path = str(tmp_path / "rig.sock")
+    server = CommandServer(controller, path=path).start()
+    client = CommandClient(path=path)
+    yield client
+    client.close()
+    server.stop()
+
+
+def call(client, cmd, **args):
+    cid = client.call(cmd, **args)
+    return client.wait([cid])[cid]
+
+
+def test_servo_rotate_returns_new_angle(client, controller):
+    event = call(client, "servo_rotate", end_angle=40, record_angle=True)
+    assert event["event"] == "done"
+    assert event["result"] == 40 == controller.servo_current_angle
+
+
+def test_servo_rotate_out_of_range_is_an_error(client, controller):
+    angle = controller.servo_current_angle
+    event = call(client, "servo_rotate", end_angle=200, record_angle=True)
+    assert event["event"] == "error"
+    assert "out of range" in event["error"]
+    assert controller.servo_current_angle == angle
+
+
+def test_interrupted_servo_rotate_is_an_error(client, controller):
+    controller.servo_stop.set()
+    try:
+        event = call(client, "servo_rotate", end_angle=40, record_angle=True)
+    finally:
+        controller.servo_stop.clear()
+    assert event["event"] == "error"
+    assert "interrupted" in event["error"]
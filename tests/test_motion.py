@@ -0,0 +1,82 @@
+import queue
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+import motion
+from motion import AxisTrack, StepperEngine
+
+PINS = (17, 22, 23, 24)
+SEQ = [[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+
+
+@pytest.fixture
+def engine():
+    engine = StepperEngine(output=lambda pins, values: None)
+    yield engine
+    engine.stop(timeout=5)
+
+
+def wait(future):
+    try:
+        return future.result(timeout=5)
+    except CancelledError:
+        return None
+
+
+def test_cancel_all_keeps_target_at_position(engine):
+    futures = [engine.submit("LR", PINS, SEQ, 20, 1, interval=0.005) for _ in range(3)]
+    time.sleep(0.03)
+    engine.cancel()
+    for future in futures:
+        wait(future)
+    assert futures[1].cancelled() and futures[2].cancelled()
+    assert 0 < engine.get_position("LR") < 20
+    assert engine.get_target("LR") == engine.get_position("LR")
+
+
+def test_cancel_queued_move_keeps_target(engine):
+    first = engine.submit("LR", PINS, SEQ, 10, 1, interval=0.002)
+    second = engine.submit("LR", PINS, SEQ, 10, -1, interval=0.002)
+    engine.cancel(second)
+    assert wait(first) == 10
+    assert wait(second) is None
+    assert engine.get_target("LR") == engine.get_position("LR") == 10
+
+
+def test_cancel_all_catches_move_between_dequeue_and_start(monkeypatch):
+    outputs = []
+    engines = []
+
+    class CancelOnDequeue(queue.Queue):
+        def get(self, block=True, timeout=None):
+            move = super().get(block, timeout)
+            if block and move is not None:
+                # 运动已出队、尚未发布为当前运动时取消全部
+                engines[0].cancel()
+            return move
+
+    monkeypatch.setattr(motion.queue, "Queue", CancelOnDequeue)
+    engine = StepperEngine(output=lambda pins, values: outputs.append(values))
+    engines.append(engine)
+    try:
+        future = engine.submit("LR", PINS, SEQ, 10, 1, interval=0.001)
+        assert wait(future) is None
+        assert future.cancelled()
+        assert not outputs
+        assert not engine.busy()
+        assert engine.get_target("LR") == engine.get_position("LR") == 0
+    finally:
+        engine.stop(timeout=5)
+
+
+def test_move_planned_before_cancel_all_is_dropped(engine):
+    outputs = []
+    engine.output = lambda pins, values: outputs.append(values)
+    move = engine.plan([AxisTrack("LR", PINS, SEQ, 10, 1)], interval=0.001)
+    engine.cancel()
+    future = engine.submit_move(move)
+    assert wait(future) is None
+    assert not outputs
+    assert engine.get_target("LR") == engine.get_position("LR") == 0
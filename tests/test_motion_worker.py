@@ -0,0 +1,80 @@
+import gc
+import threading
+
+import pytest
+
+import hardware
+import motionWorker
+from motionWorker import MotionProcess, ShmRing
+
+LOAD_GPIO = hardware.load_gpio
+PINS = (17, 22, 23, 24)
+SEQ = [[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+
+
+def test_ring_round_trip_and_wrap():
+    ring = ShmRing.create(slots=4, slot_size=64)
+    try:
+        for i in range(10):
+            assert ring.put(b"message %d" % i)
+            assert ring.get() == b"message %d" % i
+        assert ring.get() is None
+        for i in range(4):
+            assert ring.put(b"%d" % i)
+        assert not ring.put(b"full")
+        assert [ring.get() for _ in range(4)] == [b"0", b"1", b"2", b"3"]
+    finally:
+        ring.close()
+
+
+class FailingGPIO:
+    """
+    模拟后端，第 fail_after 次输出时抛出异常
+    """
+
+    def __init__(self, fail_after):
+        self.gpio = LOAD_GPIO("sim")
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def output(self, pins, values):
+        self.calls += 1
+        if self.calls >= self.fail_after:
+            raise OSError("line request lost")
+        self.gpio.output(pins, values)
+
+    def __getattr__(self, name):
+        return getattr(self.gpio, name)
+
+
+class ThreadWorker(threading.Thread):
+    """
+    在同进程线程中运行运动进程主循环
+    """
+
+    def __init__(self, *args):
+        super().__init__(target=motionWorker.run_worker, args=args, daemon=True)
+        self.start()
+
+    def wait(self, timeout=None):
+        self.join(timeout)
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    # 运动进程改为同进程线程运行，便于注入故障
+    monkeypatch.setattr(hardware, "load_gpio", lambda backend=None: FailingGPIO(5))
+    monkeypatch.setattr(motionWorker, "start_worker", ThreadWorker)
+    process = MotionProcess(backend="sim")
+    yield process
+    process.stop(timeout=5)
+    gc.unfreeze()
+    gc.enable()
+
+
+def test_failed_move_reports_error(worker):
+    future = worker.submit("LR", PINS, SEQ, 20, 1, interval=0.001)
+    with pytest.raises(RuntimeError, match="line request lost"):
+        future.result(timeout=5)
+    assert not worker.busy()
+    assert worker.get_target("LR") == worker.get_position("LR") == 4
@@ -0,0 +1,25 @@
+import time
+
+from pulseConfig import REACTION_GENERATOR_PIN
+from pulseTrain import PulseTrainRunner
+
+
+def test_runner_outputs_every_pulse():
+    levels = []
+    runner = PulseTrainRunner(lambda pins, value: levels.append((pins, value)))
+    try:
+        report = runner.start(5, 200, 0.001).result(timeout=5)
+    finally:
+        runner.close()
+    assert report["pulses"] == 5
+    assert levels == [(REACTION_GENERATOR_PIN, 1), (REACTION_GENERATOR_PIN, 0)] * 5
+
+
+def test_controller_pulse_train_can_be_aborted(controller):
+    future = controller.pulse_train(1000, 100, 0.001)
+    time.sleep(0.05)
+    assert controller.pulse_trains.busy()
+    controller.abort_pulse_train()
+    report = future.result(timeout=5)
+    assert 0 < report["pulses"] < 1000
+    assert not controller.pulse_trains.busy()
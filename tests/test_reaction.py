@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+import rotateController
+
+
+@pytest.fixture(autouse=True)
+def slow_servo(monkeypatch):
+    # 上升与下降都放慢，保证急停时舵机步骤仍在执行
+    monkeypatch.setattr(rotateController, "SERVO_GAP_DURATION", 0.02)
+    monkeypatch.setattr(rotateController, "SERVO_RESET_GAP_DURATION", 0.02)
+    monkeypatch.setattr(rotateController, "SERVO_FINAL_STAY_DURATION", 0)
+
+
+def record_writes(controller, monkeypatch):
+    writes = []
+    set_pwm = controller.servo.setPWM
+
+    def record(channel, on, off):
+        writes.append((time.perf_counter(), channel, off))
+        set_pwm(channel, on, off)
+
+    monkeypatch.setattr(controller.servo, "setPWM", record)
+    return writes
+
+
+@pytest.mark.parametrize("step_delay", [0.1, 0.75])  # 上升中、下降中
+def test_emergency_stop_interrupts_servo_step(controller, monkeypatch, step_delay):
+    writes = record_writes(controller, monkeypatch)
+    reaction = controller.start_reaction()
+    time.sleep(step_delay)
+    assert writes, "servo step should be running"
+    controller.emergency_stop()
+    stopped = time.perf_counter()
+    time.sleep(0.2)
+    assert reaction.cancelled()
+    assert not [write for write in writes if write[0] > stopped]
+
+
+def test_abort_reaction_restores_servo(controller, monkeypatch):
+    writes = record_writes(controller, monkeypatch)
+    controller.start_reaction()
+    time.sleep(0.1)
+    controller.abort_reaction()
+    time.sleep(0.2)
+    count = len(writes)
+    time.sleep(0.2)
+    assert len(writes) == count
+    assert controller.servo_current_angle == rotateController.SERVO_START_ANGLE
+    # 复位写入的是标定后的起始计数
+    start = controller.servo_calibration().count(rotateController.SERVO_START_ANGLE)
+    assert writes[-1][1:] == (rotateController.SERVO_CHANNEL, start)
@@ -0,0 +1,65 @@
+import time
+
+from scan import grid, nearest_neighbor, serpentine
+
+
+def test_serpentine_reverses_odd_rows():
+    points = grid(0, 0, 0.2, 0.1, 0.1)
+    assert serpentine(points) == [
+        (0, 0),
+        (0.1, 0),
+        (0.2, 0),
+        (0.2, 0.1),
+        (0.1, 0.1),
+        (0, 0.1),
+    ]
+
+
+def test_nearest_neighbor_visits_every_point():
+    points = [(1, 1), (0, 0.1), (0.5, 0)]
+    assert nearest_neighbor(points, (0, 0)) == [(0, 0.1), (0.5, 0), (1, 1)]
+
+
+def test_scan_moves_and_shoots_every_point(controller, monkeypatch):
+    shots = []
+    shoot_pulse = controller.shoot_pulse
+
+    def record(**kwargs):
+        shots.append(controller.current_point())
+        return shoot_pulse(**kwargs)
+
+    monkeypatch.setattr(controller, "shoot_pulse", record)
+    points = grid(0, 0, 0.2, 0.2, 0.1)
+    result = controller.start_scan(points, settle=0.001).result(timeout=60)
+    assert result["shots"] == len(points) == 9
+    assert sorted(shots) == sorted(points)
+    assert controller.current_point() == (0.2, 0.2)
+
+
+def test_abort_scan_keeps_target_at_position(controller):
+    future = controller.start_scan(grid(0, 0, 1, 1, 0.1), settle=0.001)
+    controller.abort_scan()
+    result = future.result(timeout=60)
+    assert result["shots"] < result["points"]
+    for axis in ("LR", "UD"):
+        stepper = controller.stepper
+        assert stepper.get_target(axis) == stepper.get_position(axis)
+
+
+def test_emergency_stop_during_shot_stops_the_stage(controller, monkeypatch):
+    shoot_pulse = controller.shoot_pulse
+
+    def shoot_then_stop(**kwargs):
+        shoot_pulse(**kwargs)
+        controller.emergency_stop()
+
+    monkeypatch.setattr(controller, "shoot_pulse", shoot_then_stop)
+    result = controller.start_scan(grid(0, 0, 0.3, 0, 0.1), settle=0.001).result(
+        timeout=60
+    )
+    stepper = controller.stepper
+    position = stepper.get_position("LR")
+    time.sleep(0.3)
+    assert result["shots"] == 1
+    assert position == stepper.get_position("LR") == stepper.get_target("LR") == 0
+    assert not stepper.busy()
@@ -0,0 +1,17 @@
+import time
+
+from sequencer import Sequencer, Step
+
+
+def test_stop_waits_for_cleanup_of_aborted_sequence():
+    cleaned = []
+    sequencer = Sequencer()
+    future = sequencer.start(
+        [Step("wait", lambda: time.sleep(0.1))],
+        cleanup=[lambda: (time.sleep(0.1), cleaned.append(True))],
+    )
+    time.sleep(0.02)
+    future.cancel()
+    sequencer.stop()
+    assert cleaned == [True]
+    assert not sequencer._thread.is_alive()
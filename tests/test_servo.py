@@ -0,0 +1,20 @@
+from servo import ServoCalibration, ServoTimeline
+
+
+def test_trim_past_limit_is_rejected(controller, monkeypatch):
+    writes = []
+    monkeypatch.setattr(controller.servo, "setPWM", lambda *args: writes.append(args))
+    controller.servo_current_angle = 0
+    controller.servo_rotate(
+        resolution=1, start_angle=0, end_angle=-1, gap_duration=0, record_angle=True
+    )
+    assert controller.servo_current_angle == 0
+    assert not writes
+
+
+def test_timeline_frames_only_changed_channels():
+    calibrations = {0: ServoCalibration(), 3: ServoCalibration()}
+    timeline = ServoTimeline(calibrations, {0: 0, 3: 90}, {0: 90, 3: 90}, 10)
+    assert len(timeline.frames) == 11
+    assert set(timeline.frames[0]) == {0, 3}
+    assert all(set(frame) == {0} for frame in timeline.frames[1:])
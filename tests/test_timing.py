@@ -0,0 +1,30 @@
+import pygame
+import pytest
+
+import rotateController
+from timing import LatencyProbe
+
+
+@pytest.fixture(autouse=True)
+def key_codes(monkeypatch):
+    # 无界面模式下 rotateController 不导入 pygame，按键处理需要键码
+    monkeypatch.setattr(rotateController, "pygame", pygame)
+
+
+def test_disarmed_probe_ignores_next_write():
+    probe = LatencyProbe()
+    probe.arm()
+    probe.disarm()
+    probe.hit()
+    assert probe.stats()["count"] == 0
+
+
+def test_key_without_output_is_not_measured(controller):
+    controller.key_down(pygame.K_p)
+    controller.gpio_output([5], 0)
+    assert controller.input_latency.stats()["count"] == 0
+
+
+def test_key_with_output_is_measured(controller):
+    controller.key_down(pygame.K_v)
+    assert controller.input_latency.stats()["count"] == 1
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from boardManager import BoardManager
+from trigger import PulseTrigger
+
+
+@pytest.fixture
+def board():
+    boards = BoardManager()
+    boards.add_board(bus_id=1, address=0x41)
+    boards.setPWMFreq(50)
+    board = boards.boards[0]
+    yield board
+    boards.exit()
+
+
+def test_fire_in_time(board):
+    pulse = PulseTrigger(board, {"shot": 14, "camera": 15})
+    pulse.fire({"shot": (0, 0.01), "camera": (0.001, 0.005)})
+    assert pulse.double_fires == 0
+
+
+def test_late_disarm_is_reported(board, monkeypatch):
+    pulse = PulseTrigger(board, {"shot": 14})
+    channels_off = board.channelsOff
+
+    def slow_off(channels):
+        time.sleep(0.025)  # 线程晚醒，错过下一周期的上升沿
+        channels_off(channels)
+
+    monkeypatch.setattr(board, "channelsOff", slow_off)
+    pulse.fire({"shot": (0, 0.01)})
+    assert pulse.double_fires == 1
+
+
+def test_pulses_must_fit_in_one_period(board):
+    pulse = PulseTrigger(board, {"shot": 14})
+    with pytest.raises(ValueError):
+        pulse.plan({"shot": (0.01, 0.01)})
+
+
+def test_trigger_board_shared_with_servos_is_refused(monkeypatch, tmp_path):
+    import rotateController
+
+    monkeypatch.setattr(rotateController, "PIN_TEST_CACHE", str(tmp_path / "pins"))
+    monkeypatch.setattr(rotateController, "TRIGGER_MODE", "pca9685")
+    monkeypatch.setattr(
+        rotateController, "TRIGGER_BOARD", rotateController.SERVO_BOARDS[0]
+    )
+    with pytest.raises(RuntimeError, match="RIG_TRIGGER_SHARED"):
+        rotateController.RotateController(800, 800, "test")
+
+
+def test_shot_uses_separate_trigger_board(monkeypatch, tmp_path):
+    import rotateController
+
+    monkeypatch.setattr(rotateController, "PIN_TEST_CACHE", str(tmp_path / "pins"))
+    monkeypatch.setattr(rotateController, "TRIGGER_MODE", "pca9685")
+    controller = rotateController.RotateController(800, 800, "test")
+    try:
+        assert controller.trigger.board is not controller.servo
+        controller.shoot_pulse()
+        assert controller.trigger.double_fires == 0
+    finally:
+        controller.shutdown()
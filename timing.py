@@ -0,0 +1,172 @@
+import bisect
+import math
+import time
+from array import array
+
+SPIN_NS = 500_000  # 最后 0.5 ms 忙等，避开系统唤醒抖动
+# 直方图桶上界（ns）：10us 到 100s 按 1-2-5 递增
+HISTOGRAM_BOUNDS = tuple(m * 10 ** e for e in range(4, 11) for m in (1, 2, 5)) + (
+    10 ** 11,
+)
+
+
+def sleep_until(deadline_ns, spin_ns=SPIN_NS):
+    """
+    等待到 perf_counter_ns 的绝对时刻：先 sleep 到截止前 spin_ns，剩余时间忙等
+    返回实际到达的时刻
+    """
+    remaining = deadline_ns - time.perf_counter_ns()
+    if remaining > spin_ns:
+        time.sleep((remaining - spin_ns) / 1e9)
+    now = time.perf_counter_ns()
+    while now < deadline_ns:
+        now = time.perf_counter_ns()
+    return now
+
+
+class TimingRecorder:
+    """
+    记录目标时刻与实际时刻（ns），用于统计抖动；容量固定，写满后覆盖最旧的记录
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.targets = array("q", bytes(8 * capacity))
+        self.actuals = array("q", bytes(8 * capacity))
+        self.count = 0
+
+    def record(self, target_ns, actual_ns):
+        index = self.count % self.capacity
+        self.targets[index] = target_ns
+        self.actuals[index] = actual_ns
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+    def errors(self):
+        """
+        实际时刻与目标时刻的偏差（ns）
+        """
+        n = min(self.count, self.capacity)
+        return [self.actuals[i] - self.targets[i] for i in range(n)]
+
+    def stats(self):
+        """
+        偏差统计，单位 us
+        """
+        errors = self.errors()
+        if not errors:
+            return {"count": 0, "mean_us": 0.0, "std_us": 0.0, "max_us": 0.0}
+        mean = sum(errors) / len(errors)
+        std = math.sqrt(sum((e - mean) ** 2 for e in errors) / len(errors))
+        return {
+            "count": len(errors),
+            "mean_us": mean / 1000,
+            "std_us": std / 1000,
+            "max_us": max(abs(e) for e in errors) / 1000,
+        }
+
+
+class LatencyProbe:
+    """
+    记录从事件发生（arm）到第一次硬件输出（hit）的延迟
+    """
+
+    def __init__(self, capacity=1024):
+        self.recorder = TimingRecorder(capacity)
+        self._armed_ns = None
+
+    def arm(self):
+        self._armed_ns = time.perf_counter_ns()
+
+    def hit(self):
+        armed = self._armed_ns
+        if armed is not None:
+            self._armed_ns = None
+            self.recorder.record(armed, time.perf_counter_ns())
+
+    def disarm(self):
+        self._armed_ns = None
+
+    def stats(self):
+        return self.recorder.stats()
+
+
+class LatencyHistogram:
+    """
+    固定分桶的耗时直方图，计数保存在预分配数组中，记录时只做一次二分查找
+    分位数取所在桶的上界（不超过最大值）
+    """
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS):
+        self.bounds = array("q", bounds)
+        self.counts = array("Q", bytes(8 * (len(bounds) + 1)))  # 最后一桶为溢出
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, duration_ns):
+        self.counts[bisect.bisect_left(self.bounds, duration_ns)] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def percentile(self, p):
+        """
+        p: 0-100，返回 ns
+        """
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                if i >= len(self.bounds):
+                    return self.max_ns
+                return min(self.bounds[i], self.max_ns)
+        return self.max_ns
+
+    def stats(self):
+        """
+        统计，单位 us
+        """
+        return {
+            "count": self.count,
+            "mean_us": self.total_ns / self.count / 1000 if self.count else 0.0,
+            "p50_us": self.percentile(50) / 1000,
+            "p99_us": self.percentile(99) / 1000,
+            "max_us": self.max_ns / 1000,
+        }
+
+
+class RateMeter:
+    """
+    最近 capacity 次事件的时刻，计算最近 window 秒内的频率（如帧率）
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.times = array("q", bytes(8 * capacity))
+        self.count = 0
+
+    def tick(self):
+        self.times[self.count % self.capacity] = time.perf_counter_ns()
+        self.count += 1
+
+    def rate(self, window=1.0):
+        now = time.perf_counter_ns()
+        since = now - int(window * 1e9)
+        n = 0
+        for k in range(self.count - 1, max(self.count - self.capacity, 0) - 1, -1):
+            if self.times[k % self.capacity] < since:
+                break
+            n += 1
+        return n / window
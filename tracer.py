@@ -0,0 +1,173 @@
+"""
+硬件动作追踪：预分配的环形缓冲区记录 (ns 时间戳, 子系统, 引脚/寄存器, 值)，
+关闭时调用方只多一次属性判断；可导出为紧凑二进制文件或 Chrome trace JSON
+（chrome://tracing 或 https://ui.perfetto.dev 打开）
+"""
+import itertools
+import json
+import os
+import struct
+import time
+from array import array
+
+# 子系统
+GPIO_OUT = 1  # target: 引脚位掩码，value: 电平位掩码
+I2C_WRITE = 2  # target: 地址 << 8 | 寄存器，value: 数据
+I2C_BLOCK = 3  # target: 地址 << 8 | 起始寄存器，value: 前 8 个字节（小端）
+STEP = 4  # target: 轴名编号，value: 该轴位置（半步）
+PULSE = 5  # target: 引脚位掩码，value: 脉宽 ns
+MARK = 6  # target: 名称编号，value: 自定义
+
+SUBSYSTEM_NAMES = {
+    GPIO_OUT: "gpio",
+    I2C_WRITE: "i2c",
+    I2C_BLOCK: "i2c_block",
+    STEP: "step",
+    PULSE: "pulse",
+    MARK: "mark",
+}
+
+BINARY_MAGIC = b"RTRC"
+BINARY_HEADER = struct.Struct("<4sHI")  # magic, version, 记录数
+BINARY_RECORD = struct.Struct("<qBqq")
+
+
+def pin_mask(pins):
+    """
+    引脚（int 或列表）-> 位掩码
+    """
+    if isinstance(pins, int):
+        return 1 << pins
+    mask = 0
+    for pin in pins:
+        mask |= 1 << pin
+    return mask
+
+
+def level_mask(pins, values):
+    """
+    与 GPIO.output 参数对应的高电平位掩码
+    """
+    if isinstance(pins, int):
+        return (1 << pins) if values else 0
+    if not isinstance(values, (list, tuple)):
+        values = [values] * len(pins)
+    mask = 0
+    for pin, value in zip(pins, values):
+        if value:
+            mask |= 1 << pin
+    return mask
+
+
+class Tracer:
+    def __init__(self, capacity=1 << 16):
+        # 容量取 2 的幂，下标用位与代替取模
+        capacity = 1 << (capacity - 1).bit_length()
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.enabled = False
+        self.timestamps = array("q", bytes(8 * capacity))
+        self.subsystems = array("B", bytes(capacity))
+        self.targets = array("q", bytes(8 * capacity))
+        self.values = array("q", bytes(8 * capacity))
+        self.names = {}  # 名称 -> 编号，用于轴名等字符串
+        self.reset()
+
+    def reset(self):
+        self._counter = itertools.count()
+        self.count = 0
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def intern(self, name):
+        code = self.names.get(name)
+        if code is None:
+            code = self.names[name] = len(self.names)
+        return code
+
+    def record(self, subsystem, target, value):
+        n = next(self._counter)  # 多线程下取号是原子的
+        i = n & self.mask
+        self.timestamps[i] = time.perf_counter_ns()
+        self.subsystems[i] = subsystem
+        self.targets[i] = target
+        self.values[i] = value
+        self.count = n + 1
+
+    def records(self):
+        """
+        按时间顺序返回缓冲区中的记录
+        """
+        n = min(self.count, self.capacity)
+        start = self.count - n
+        result = []
+        for k in range(start, start + n):
+            i = k & self.mask
+            result.append(
+                (
+                    self.timestamps[i],
+                    self.subsystems[i],
+                    self.targets[i],
+                    self.values[i],
+                )
+            )
+        result.sort()
+        return result
+
+    def dump_binary(self, path):
+        """
+        二进制格式：文件头 + 定长记录 + 名称表（4 字节长度 + JSON）
+        """
+        records = self.records()
+        names = json.dumps(self.names).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(BINARY_HEADER.pack(BINARY_MAGIC, 1, len(records)))
+            for record in records:
+                f.write(BINARY_RECORD.pack(*record))
+            f.write(struct.pack("<I", len(names)))
+            f.write(names)
+        return len(records)
+
+    def dump_chrome(self, path):
+        """
+        Chrome trace event 格式，每个子系统一条时间线
+        """
+        records = self.records()
+        code_names = {code: name for name, code in self.names.items()}
+        t0 = records[0][0] if records else 0
+        events = []
+        for ts, subsystem, target, value in records:
+            if subsystem in (I2C_WRITE, I2C_BLOCK):
+                name = "0x%02X:0x%02X" % (target >> 8, target & 0xFF)
+                args = {"value": "0x%X" % value}
+            elif subsystem in (STEP, MARK):
+                name = code_names.get(target, str(target))
+                args = {"value": value}
+            else:
+                name = "pins 0x%X" % target
+                args = {"value": "0x%X" % value}
+            event = {
+                "name": name,
+                "cat": SUBSYSTEM_NAMES.get(subsystem, str(subsystem)),
+                "ph": "i",
+                "s": "t",
+                "ts": (ts - t0) / 1000,
+                "pid": os.getpid(),
+                "tid": subsystem,
+                "args": args,
+            }
+            if subsystem == PULSE:
+                # 记录发生在下降沿，换算为从上升沿开始的区间
+                event["ph"] = "X"
+                event["ts"] = (ts - t0 - value) / 1000
+                event["dur"] = value / 1000
+            events.append(event)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ns"}, f)
+        return len(events)
+
+
+TRACER = Tracer()
+if os.environ.get("RIG_TRACE", "0") == "1":
+    TRACER.enable()
@@ -0,0 +1,75 @@
+"""
+硬件定时触发：用 PCA9685 空闲通道的 ON/OFF 相位寄存器产生单次定宽脉冲，
+各通道的脉宽与相对相位由芯片计数器保证，CPU 负责装载寄存器和在脉冲结束后关闭通道
+
+注意 CPU 仍有一个截止时刻：芯片每个 PWM 周期都会重复输出这些脉冲，
+必须在下一周期的第一个上升沿之前关闭通道（50Hz 时约为脉冲结束后 6~8 ms），
+否则会多发射一次；超时关闭时记录错误并计入 double_fires
+"""
+import logging
+import time
+
+from timing import sleep_until
+
+logger = logging.getLogger(name="Trigger")
+
+PWM_RESOLUTION = 4096  # 12-bit
+OSC_TOLERANCE = 0.1  # 内部振荡器频率偏差上限
+DISARM_MARGIN = 1 / 1000  # 最后一个下降沿之后再等待的时间，单位秒
+
+
+class PulseTrigger:
+    """
+    channels: {名称: 板内通道号}，所有脉冲都必须在一个 PWM 周期内结束，
+    周期剩余部分用于关闭通道，防止下一周期重复输出
+    """
+
+    def __init__(self, board, channels):
+        self.board = board
+        self.channels = dict(channels)
+        self.double_fires = 0  # 关闭通道晚于下一周期上升沿的次数
+        self.board.channelsOff(self.channels.values())
+
+    def plan(self, pulses):
+        """
+        pulses: {名称: (相对计数器起点的延迟, 脉宽)}，单位秒
+        返回 ({通道号: (on, off)}, 装载后到关闭通道的等待时间 ns)
+        """
+        period_ns = self.board.getPeriodNs()
+        tick_ns = period_ns / PWM_RESOLUTION
+        pwms = {}
+        end = 0
+        for name, (delay, width) in pulses.items():
+            on = int(round(delay * 1e9 / tick_ns))
+            off = on + max(1, int(round(width * 1e9 / tick_ns)))
+            pwms[self.channels[name]] = (on, off)
+            end = max(end, off)
+        hold_ns = int(end * tick_ns * (1 + OSC_TOLERANCE) + DISARM_MARGIN * 1e9)
+        if end >= PWM_RESOLUTION or hold_ns >= period_ns * (1 - OSC_TOLERANCE):
+            raise ValueError("Pulses do not fit in one PWM period: %s" % pulses)
+        return pwms, hold_ns
+
+    def fire(self, pulses):
+        """
+        输出一组脉冲并在结束后关闭通道，返回计数器启动时刻（perf_counter ns）
+        """
+        pwms, hold_ns = self.plan(pulses)
+        period_ns = self.board.getPeriodNs()
+        first_on = min(on for on, _ in pwms.values())
+        # 下一周期最早的上升沿，按振荡器偏快估计
+        repeat_ns = (period_ns + first_on * period_ns / PWM_RESOLUTION) * (
+            1 - OSC_TOLERANCE
+        )
+        started = self.board.armOneShot(pwms)
+        sleep_until(started + hold_ns)
+        self.board.channelsOff(pwms)
+        late_ns = time.perf_counter_ns() - started - repeat_ns
+        if late_ns > 0:
+            self.double_fires += 1
+            logger.error(
+                "Trigger disarmed %.2f ms into the next PWM period, "
+                "pulses %s may have fired twice",
+                late_ns / 1e6,
+                sorted(pulses),
+            )
+        return started